@@ -24,13 +24,14 @@ except:
 try:
     #from .hexhashes import *  # Can still be explicity imported separately
     #from .ecmath import *     # but not including by default
-    from .base58 import b58e, b58d
-    from .bech32 import bech32encode, bech32decode
+    from .base58 import b58e, b58d, b58encode, b58decode, b58check_valid, b58check_validate_lines, b58check_validate_file
+    from .bech32 import bech32encode, bech32decode, bech32encode_b, bech32decode_b
     from .miscfuncs import strlify, isitstring, isitint, hexstrlify, hexreverse, dechex, normalize_input
     from .miscbitcoinfuncs import genkeyhex, genkey, oppushdatalen, intfromoppushdatalen, tovarint, numvarintbytes, fromvarint, getandstrip_varintdata, inttoDER, inttoLEB128, LEB128toint
-    from .bitcoin import uncompress, compress, privtopub, addprivkeys, subtractprivkeys, multiplypriv, multiplypub, addpubs, subtractpubs, pubtoaddress, pubtosegwit, validatepubkey, wiftohex, privtohex, Coin
+    from .bitcoin import uncompress, compress, privtopub, addprivkeys, subtractprivkeys, multiplypriv, multiplypub, multiplypub_sum, addpubs, addpubs_many, subtractpubs, pubtoaddress, pubtosegwit, validatepubkey, wiftohex, privtohex, Coin, PublicKey
     from .signandverify import sign, verify, checksigformat, signmsg, verifymsg, checkmsgsigformat
     from .stealth import paystealth, receivestealth, newstealthaddr
+    from .merkle import merkleroot, merkleroot_b, merklebranch_b, merkleverify_b
     from .bip32 import BIP32
     from .bip39wordlists import BIP39ENGWORDLIST
     from .bip39 import BIP39
@@ -45,13 +46,14 @@ except Exception as e:
         raise Exception("Unknown problem with imports.")
     #from hexhashes import *
     #from ecmath import *
-    from base58 import b58e, b58d
-    from bech32 import bech32encode, bech32decode
+    from base58 import b58e, b58d, b58encode, b58decode, b58check_valid, b58check_validate_lines, b58check_validate_file
+    from bech32 import bech32encode, bech32decode, bech32encode_b, bech32decode_b
     from miscfuncs import strlify, isitstring, isitint, hexstrlify, hexreverse, dechex, normalize_input
     from miscbitcoinfuncs import genkeyhex, genkey, oppushdatalen, intfromoppushdatalen, tovarint, numvarintbytes, fromvarint, getandstrip_varintdata, inttoDER, inttoLEB128, LEB128toint
-    from bitcoin import uncompress, compress, privtopub, addprivkeys, subtractprivkeys, multiplypriv, multiplypub, addpubs, subtractpubs, pubtoaddress, pubtosegwit, validatepubkey, wiftohex, privtohex, Coin
+    from bitcoin import uncompress, compress, privtopub, addprivkeys, subtractprivkeys, multiplypriv, multiplypub, multiplypub_sum, addpubs, addpubs_many, subtractpubs, pubtoaddress, pubtosegwit, validatepubkey, wiftohex, privtohex, Coin, PublicKey
     from signandverify import sign, verify, checksigformat, signmsg, verifymsg, checkmsgsigformat
     from stealth import paystealth, receivestealth, newstealthaddr
+    from merkle import merkleroot, merkleroot_b, merklebranch_b, merkleverify_b
     from bip32 import BIP32
     from bip39wordlists import BIP39ENGWORDLIST
     from bip39 import BIP39
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+'''
+Rough timings for the elliptic curve math, once for each big-integer
+backend that is available. Run it directly:
+
+    python _benchmark.py
+
+Numbers are the average time per call, in microseconds.
+'''
+
+
+from __future__ import print_function, division, absolute_import
+
+import timeit
+try:
+    ModuleNotFoundError
+except:
+    ModuleNotFoundError = ImportError
+
+try:
+    from . import ecmath
+    from .bitcoin import privtopub, multiplypub, uncompress, UNCOMPRESS_CACHE
+    from .signandverify import sign, verify
+except Exception as e:
+    if type(e) != ImportError and \
+       type(e) != ModuleNotFoundError and \
+       type(e) != ValueError and \
+       type(e) != SystemError:
+        raise Exception("Unknown problem with imports.")
+    import ecmath
+    from bitcoin import privtopub, multiplypub, uncompress, UNCOMPRESS_CACHE
+    from signandverify import sign, verify
+
+
+h = 'f7011e94125b5bba7f62eb25efe23339eb1637539206c87df3ee61b5ec6b023e'
+p = 'c05694a7af0e01dceb63e5912a415c28d3fc823ca1fd3fa34d41afde03740466'
+x = 2521213890399410648018095333325722136449021566908310412768334520696982806641
+
+BENCHMARKS = [
+    ('modinv', lambda: ecmath.modinv(x), 2000),
+    ('pow_mod', lambda: ecmath.pow_mod(x, (ecmath.P+1)//4, ecmath.P), 2000),
+    ('uncompress', lambda: uncompress(pub), 2000),
+    ('privtopub', lambda: privtopub(p), 200),
+    ('multiplypub', lambda: multiplypub(pub, h), 100),
+    ('verify', lambda: verify(h, sig, pub), 100),
+]
+
+
+def run(backend):
+    global pub, sig
+    ecmath.setbackend(backend)
+    # Time the math, not cache hits on the one pubkey being reused
+    maxsize = UNCOMPRESS_CACHE.maxsize
+    UNCOMPRESS_CACHE.resize(0)
+    try:
+        pub = privtopub(p)
+        sig = sign(h, p)
+        verify(h, sig, pub)
+        o = {}
+        for name, f, number in BENCHMARKS:
+            o[name] = 1e6 * min(timeit.repeat(f, number=number,
+                                              repeat=3)) / number
+    finally:
+        UNCOMPRESS_CACHE.resize(maxsize)
+    return o
+
+
+if __name__ == "__main__":
+    backends = ['python']
+    if ecmath.gmpy2 is not None:
+        backends.append('gmpy2')
+    default = ecmath.getbackend()
+    results = [(b, run(b)) for b in backends]
+    ecmath.setbackend(default)
+    print("%-14s" % "" + "".join("%12s" % b for b in backends) +
+          ("%12s" % "speedup" if len(backends) > 1 else ""))
+    for name, f, number in BENCHMARKS:
+        line = "%-14s" % name + "".join("%12.1f" % r[name] for b, r in results)
+        if len(backends) > 1:
+            line += "%11.1fx" % (results[0][1][name] / results[1][1][name])
+        print(line)
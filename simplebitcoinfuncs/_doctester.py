@@ -28,11 +28,13 @@ try:
     from .hexhashes import *
     from .ecmath import *
     from .base58 import *
+    from .bech32 import bech32encode, bech32decode, bech32encode_b, bech32decode_b, convertbits
     from .miscfuncs import *
     from .miscbitcoinfuncs import *
     from .bitcoin import *
     from .signandverify import *
     from .stealth import *
+    from .merkle import *
     from .bip32 import *
     from .bip39 import *
     from .electrum1 import *
@@ -47,11 +49,13 @@ except Exception as e:
     from hexhashes import *
     from ecmath import *
     from base58 import *
+    from bech32 import bech32encode, bech32decode, bech32encode_b, bech32decode_b, convertbits
     from miscfuncs import *
     from miscbitcoinfuncs import *
     from bitcoin import *
     from signandverify import *
     from stealth import *
+    from merkle import *
     from bip32 import *
     from bip39 import *
     from electrum1 import *
@@ -105,6 +109,75 @@ def hexhashes_py___doctest():
     >>> hash512('aabbccdd')
     '20df4f6c9244b517cb5dd1c3b1e13bb316a45f5b904fc57799b66389947186d266ad611ee282fdea6630da4dbc96015beba2faecc110782015df662c4abf6297'
 
+    >>> b = unhexlify('aabbccdd')
+    >>> hexlify(hash160_b(b)) == b'd6e9254683798a28eabd2626fd573cf2cf3869f9'
+    True
+    >>> hash256_b(b) == hash256_b(bytearray(b)) == hash256_b(memoryview(b)) \
+    == unhexlify(hash256('aabbccdd'))
+    True
+    >>> all(f(b) == unhexlify(g('aabbccdd')) for f, g in
+    ...     [(sha256_b, sha256), (sha512_b, sha512), (sha512d_b, sha512d),
+    ...      (ripemd160_b, ripemd160), (hash512_b, hash512)])
+    True
+    >>> type(sha256('')) is str
+    True
+
+    >>> recs = [bytes(bytearray([i]*33)) for i in range(50)]
+    >>> out = hash160_many(recs)
+    >>> len(out), out[20:40] == hash160_b(recs[1])
+    (1000, True)
+    >>> hash160_many(b''.join(recs), 33) == out
+    True
+    >>> hash160_many(iter(recs), processes=2, threshold=0) == out
+    True
+    >>> hash160_many([memoryview(r) for r in recs], processes=2,
+    ...              threshold=0) == out
+    True
+    >>> hash256_many(bytearray(b''.join(recs)), 33, 2, 0) == \
+    b''.join(hash256_b(r) for r in recs)
+    True
+    >>> sha256_many([b'', b'abc'])[32:] == sha256_b(b'abc')
+    True
+    >>> sha256_many(b'abc', 2)
+    Traceback (most recent call last):
+    ...
+    Exception: Buffer length is not a multiple of the record width.
+
+    >>> m = midstate(unhexlify('aabb'))
+    >>> m.digest(unhexlify('ccdd')) == sha256_b(unhexlify('aabbccdd'))
+    True
+    >>> m.hexdigest('ccdd')
+    '8d70d691c822d55638b6e7fd54cd94170c87d19eb1f628b757506ede5688d297'
+    >>> m.hexdigest() == sha256('aabb')
+    True
+    >>> midstate(b'', 'ripemd160').hexdigest('aabbccdd')
+    '148164ccf60a825bc3250722074c3426a7f67fcb'
+    >>> import hmac, hashlib
+    >>> hmacmidstate(b'key').digest(b'abc') == \
+    hmac.new(b'key', b'abc', hashlib.sha512).digest()
+    True
+
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> os.close(fd)
+    >>> sha256_file(path) == sha256('')
+    True
+    >>> with open(path, 'wb') as f:
+    ...     n = f.write(unhexlify('aabbccdd') * 300000)
+    >>> hash256_file(path) == hash256('aabbccdd' * 300000)
+    True
+    >>> try:
+    ...     from pathlib import Path
+    ... except ImportError:
+    ...     Path = str
+    >>> sha256_file(Path(path)) == sha256_file(path)
+    True
+    >>> with open(path, 'rb') as f:
+    ...     f.read(4) == unhexlify('aabbccdd') and \
+    sha256_file_b(f) == sha256_b(unhexlify('aabbccdd') * 299999)
+    True
+    >>> os.remove(path)
+
     '''
     return
 
@@ -170,6 +243,250 @@ def ecmath_py___doctest():
     >>> pow_mod(int(N//4),int(N//15),P) == \
     85863265686857850576725992990591539765753424982812429250530061375940639195105
     True
+
+    >>> getbackend() in BACKENDS
+    True
+    >>> oldbackend = getbackend()
+    >>> setbackend('python')
+    >>> modinv(2521213890399410648018095333325722136449021566908310412768334520696982806641) == \
+    17465617466841484688650846354295959695753514552349626970717521890536775674935
+    True
+    >>> type(ecmultiply_wnaf(Gx,Gy,42)[0]) == type(ecmultiply_affine(Gx,Gy,42)[0])
+    True
+    >>> setbackend(oldbackend)
+    >>> modinv(0) # doctest: +IGNORE_EXCEPTION_DETAIL
+    Traceback (most recent call last):
+    ...
+    ZeroDivisionError: No inverse exists.
+    >>> setbackend('nonsense')
+    Traceback (most recent call last):
+    ...
+    Exception: Unknown backend: nonsense
+    >>> decompress_y(Gx,0) == Gy
+    True
+    >>> decompress_y(Gx,1) == P - Gy
+    True
+
+    >>> pt = Point(Gx,Gy) * 42
+    >>> pt.Z != 1
+    True
+    >>> pt.tohex()
+    '02fe8d1eb1bcb3432b1db5833ff5f2226d9cb5e65cee430558c18ed3a3c86ce1af'
+    >>> pt.Z
+    1
+    >>> pt.affine() == ecmultiply_affine(Gx,Gy,42)
+    True
+    >>> Point.fromhex(pt.tohex(False)) == pt
+    True
+    >>> Point.frombytes(pt.tobytes()) == Point.fromscalar(42)
+    True
+    >>> pt + pt == pt * 2 == 2 * pt
+    True
+    >>> pt + Point.fromscalar(42) == Point.fromscalar(84)
+    True
+    >>> (pt - pt).isinfinity()
+    True
+    >>> pt != -pt
+    True
+    >>> len(set([pt, Point.fromscalar(42), Point.fromscalar(43)]))
+    2
+    >>> Point.fromhex('05' + pt.tohex()[2:])
+    Traceback (most recent call last):
+    ...
+    Exception: Invalid public key.
+
+    >>> vals = [3, N-1, 2521213890399410648018095333325722136449021566908310412768334520696982806641]
+    >>> batch_modinv(vals) == [modinv(v) for v in vals]
+    True
+    >>> batch_modinv(vals,N) == [modinv(v,N) for v in vals]
+    True
+    >>> batch_modinv([2, 0, P])
+    [57896044618658097711785492504343953926634992332820282019728792003954417335832, 0, 0]
+    >>> batch_modinv([])
+    []
+    >>> pts = [ecmultiply_jacobian(Gx,Gy,j) for j in (5, 6, 7)]
+    >>> batch_to_affine(pts + [JACOBIAN_INFINITY]) == [to_affine(*q) for q in pts] + [None]
+    True
+
+    >>> ecmultiply(Gx,Gy,42) == ecmultiply_affine(Gx,Gy,42)
+    True
+
+    >>> ecmultiply(Gx,Gy,N-1) == (Gx, P-Gy)
+    True
+
+    >>> X,Y,Z = jacobian_double(*to_jacobian(Gx,Gy))
+    >>> to_affine(X,Y,Z) == ecdouble(Gx,Gy)
+    True
+    >>> to_affine(*jacobian_add_affine(X,Y,Z,Gx,Gy)) == ecmultiply_affine(Gx,Gy,3)
+    True
+    >>> to_affine(*jacobian_add(X,Y,Z,X,Y,Z)) == ecmultiply_affine(Gx,Gy,4)
+    True
+    >>> jacobian_add_affine(Gx,Gy,1,Gx,P-Gy)[2]
+    0
+    >>> to_affine(*JACOBIAN_INFINITY)
+    Traceback (most recent call last):
+    ...
+    Exception: Point at infinity.
+
+    >>> ecmultiply_base(42) == ecmultiply_affine(Gx,Gy,42)
+    True
+    >>> ecmultiply_base(N-1) == (Gx, P-Gy)
+    True
+    >>> k = 86160004736639257141798190143937095024102878958814199546049053726283481854320
+    >>> ecmultiply_base(k) == to_affine(*ecmultiply_jacobian(Gx,Gy,k))
+    True
+    >>> ecmultiply_base(0)
+    Traceback (most recent call last):
+    ...
+    Exception: Invalid scalar.
+    >>> ecmultiply_base(-5)
+    Traceback (most recent call last):
+    ...
+    Exception: Invalid scalar.
+
+    >>> wnaf(7,3)
+    [-1, 0, 0, 1]
+    >>> sum(d << i for i, d in enumerate(wnaf(k))) == k
+    True
+    >>> x,y = ecmultiply(Gx,Gy,42)
+    >>> ecmultiply_wnaf(x,y,k) == ecmultiply_affine(x,y,k)
+    True
+    >>> ecmultiply_wnaf(x,y,k,3) == ecmultiply_wnaf(x,y,k,7)
+    True
+    >>> ecmultiply_wnaf(x,y,N-1) == (x, P-y)
+    True
+    >>> ecmultiply_wnaf(x,y,-5)
+    Traceback (most recent call last):
+    ...
+    Exception: Invalid scalar.
+
+    >>> ecmultiply_joint(Gx,Gy,k,x,y,99) == \
+    to_affine(*jacobian_add_affine(*(ecmultiply_jacobian(Gx,Gy,k) + ecmultiply_affine(x,y,99))))
+    True
+    >>> ecmultiply_joint(Gx,Gy,0,x,y,k) == ecmultiply_affine(x,y,k)
+    True
+    >>> ecmultiply_joint(Gx,Gy,42,Gx,Gy,N-42,jacobian=True)[2]
+    0
+
+    >>> ecmultiply(Gx,Gy,LAMBDA) == ((BETA * Gx) % P, Gy)
+    True
+    >>> k1, k2 = glvsplit(k)
+    >>> (k1 + k2*LAMBDA - k) % N == 0 and abs(k1) < 2**128 and abs(k2) < 2**128
+    True
+    >>> all(ecmultiply_wnaf(x,y,j,glv=True) == ecmultiply_affine(x,y,j) \
+            for j in (1, 2, 3, 42, LAMBDA, LAMBDA+1, N-LAMBDA, 2**128, k, N-1))
+    True
+    >>> all(ecmultiply_wnaf(x,y,j,glv=False) == ecmultiply(x,y,j) \
+            for j in (2**255, N//3, 7*k % N, 1234567890123456789))
+    True
+    >>> ecmultiply_joint(Gx,Gy,k,x,y,LAMBDA,glv=True) == \
+    ecmultiply_joint(Gx,Gy,k,x,y,LAMBDA,glv=False)
+    True
+    >>> ecmultiply_joint(Gx,Gy,0,x,y,N-1,glv=True) == (x, P-y)
+    True
+
+    >>> terms = [ecmultiply_base(j) + (j*j,) for j in range(1, 81)]
+    >>> ecmultiply_sum(terms) == ecmultiply_base(sum(j**3 for j in range(1, 81)))
+    True
+    >>> ecmultiply_sum(terms[:5] + [(x, y, 0)]) == ecmultiply_base(sum(j**3 for j in range(1, 6)))
+    True
+    >>> ecmultiply_sum([(x, y, k), (x, y, N-k)], jacobian=True)[2]
+    0
+
+    >>> list(ecwalk(40,3)) == [ecmultiply_affine(Gx,Gy,j) for j in (40, 41, 42)]
+    True
+    >>> list(ecwalk(40,5,blocksize=2)) == list(ecwalk(40,5))
+    True
+    >>> hexlify(list(ecwalk(42,1,encoding='compressed'))[0]) == \
+    b'02fe8d1eb1bcb3432b1db5833ff5f2226d9cb5e65cee430558c18ed3a3c86ce1af'
+    True
+    >>> [len(b) for b in ecwalk(N-2,encoding='uncompressed')]
+    [65, 65]
+    >>> list(ecwalk(N-1)) == [(Gx, P-Gy)]
+    True
+
+    >>> import os, tempfile
+    >>> tmpdir = tempfile.mkdtemp()
+    >>> savebasetable(os.path.join(tmpdir, 'g.tbl'))
+    >>> os.path.getsize(os.path.join(tmpdir, 'g.tbl'))
+    61456
+    >>> setbasetable(None)
+    >>> t = loadbasetable(os.path.join(tmpdir, 'g.tbl'))
+    >>> len(t), t.window, t[0] == (Gx, Gy)
+    (960, 4, True)
+    >>> ecmultiply_base(k) == ecmultiply_affine(Gx,Gy,k)
+    True
+    >>> setbasetable(None)
+    >>> t.close()
+    >>> t = loadbasetable(os.path.join(tmpdir, 'g.tbl'))
+    >>> setbackend(getbackend())
+    >>> t._file.closed
+    True
+    >>> with open(os.path.join(tmpdir, 'g.tbl'), 'rb') as f:
+    ...     b = bytearray(f.read())
+    >>> b[1000] ^= 1
+    >>> with open(os.path.join(tmpdir, 'c.tbl'), 'wb') as f:
+    ...     n = f.write(b)
+    >>> loadbasetable(os.path.join(tmpdir, 'c.tbl'))
+    Traceback (most recent call last):
+    ...
+    Exception: Table file is corrupt.
+    >>> savetable(os.path.join(tmpdir, 'c.tbl'), [(x,y)] * 960, 4)
+    >>> loadbasetable(os.path.join(tmpdir, 'c.tbl'))
+    Traceback (most recent call last):
+    ...
+    Exception: Not a generator table.
+    >>> savetable(os.path.join(tmpdir, 'p.tbl'), wnaftable(x,y,6), 6)
+    >>> t = loadtable(os.path.join(tmpdir, 'p.tbl'))
+    >>> list(t) == wnaftable(x,y,6)
+    True
+    >>> ecmultiply_wnaf(x,y,k,6,table=t,glv=True) == ecmultiply_affine(x,y,k)
+    True
+    >>> t[16]
+    Traceback (most recent call last):
+    ...
+    IndexError: Table index out of range.
+    >>> loadbasetable(os.path.join(tmpdir, 'p.tbl'))
+    Traceback (most recent call last):
+    ...
+    Exception: Not a generator table.
+    >>> savetable(os.path.join(tmpdir, 'z.tbl'), wnaftable(x,y,6))
+    >>> z = loadtable(os.path.join(tmpdir, 'z.tbl'))
+    >>> z.window
+    0
+    >>> z.close()
+    >>> loadbasetable(os.path.join(tmpdir, 'z.tbl'))
+    Traceback (most recent call last):
+    ...
+    Exception: Not a generator table.
+    >>> t.close()
+    >>> import shutil; shutil.rmtree(tmpdir)
+
+    >>> POINT_TABLES.lookup(x,y) is None
+    True
+    >>> POINT_TABLES.resize(10**6)
+    >>> [POINT_TABLES.lookup(x,y) is None for i in range(4)]
+    [True, True, True, False]
+    >>> ecmultiply_wnaf(x,y,k) == ecmultiply_affine(x,y,k)
+    True
+    >>> s = ecadd(*(ecmultiply_affine(Gx,Gy,k) + ecmultiply_affine(x,y,N-k)))
+    >>> ecmultiply_joint(Gx,Gy,k,x,y,N-k) == s
+    True
+    >>> st = POINT_TABLES.stats()
+    >>> st['tables'], st['builds'], st['hits']
+    (1, 1, 2)
+    >>> POINT_TABLES.resize(1)
+    >>> POINT_TABLES.stats()['tables'], POINT_TABLES.used
+    (0, 0)
+    >>> POINT_TABLES.resize(0)
+    >>> pts = [(Gx,Gy), to_jacobian(x,y), ecmultiply_jacobian(x,y,2)]
+    >>> ecadd_many(pts) == ecmultiply(Gx,Gy,1+42*3)
+    True
+    >>> ecadd_many([])
+    Traceback (most recent call last):
+    ...
+    Exception: Point at infinity.
+    >>> POINT_TABLES.clear()
     '''
     return
 
@@ -218,6 +535,117 @@ def base58_py___doctest():
     Traceback (most recent call last):
     ...
     Exception: Character '0' is not a valid base58 character
+
+    >>> b58encode(unhexlify('055c16274562a91d531f6043f86c68d3a0f65be42a'))
+    '3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL'
+    >>> b58decode('3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL') == \
+    unhexlify('055c16274562a91d531f6043f86c68d3a0f65be42a')
+    True
+    >>> b58decode(b58encode(b'')) == b''
+    True
+    >>> b58decode('1111', False) == unhexlify('00000000')
+    True
+    >>> b58d('3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL', True, 21)
+    '055c16274562a91d531f6043f86c68d3a0f65be42a'
+    >>> b58d('3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL', True, 33)
+    '055c16274562a91d531f6043f86c68d3a0f65be42a'
+    >>> b58e('00' * 21)
+    '1111111111111111111114oLvT2'
+    >>> b58d('1111111111111111111114oLvT2', True, 21) == '00' * 21
+    True
+    >>> b58d('1111111111111111111114oLvT2', True, 22) == '00' * 21
+    True
+    >>> b58d('11111111111111111111111111111111273YYY', True, 32)
+    Traceback (most recent call last):
+    ...
+    AssertionError
+    >>> b58decode(str('1111111111z0'))
+    Traceback (most recent call last):
+    ...
+    Exception: Character '0' is not a valid base58 character
+
+    >>> b58check_valid('3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL')
+    '05'
+    >>> b58check_valid('1111111111111111111114oLvT2')
+    '00'
+    >>> [b58check_valid(s) for s in ('3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GM',
+    ...                              '3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1G0', '', '1')]
+    [False, False, False, False]
+
+    >>> lines = ['1111111111111111111114oLvT2\\n', 'nope\\n', \
+    '  3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL  \\n']
+    >>> list(b58check_validate_lines(lines, 1))
+    [(1, '1111111111111111111114oLvT2', '00'), (2, 'nope', False), (3, '3A5vdSL9MQrKRijvxr8S3V2DQ918XPL1GL', '05')]
+    >>> list(b58check_validate_lines(iter(lines * 3), 2, 2, 0)) == \
+    list(b58check_validate_lines(lines * 3, 1)) == \
+    list(b58check_validate_lines(iter(lines * 3), 2, 2, 4)) == \
+    list(b58check_validate_lines(iter(lines * 3), 2, 2))
+    True
+    >>> import os, tempfile
+    >>> fd, path = tempfile.mkstemp()
+    >>> with os.fdopen(fd, 'w') as f:
+    ...     f.writelines(lines)
+    >>> [v for n, l, v in b58check_validate_file(path, 1)]
+    ['00', False, '05']
+    >>> os.remove(path)
+
+    >>> xkey = '0488b21e' + '00' * 74
+    >>> x = b58e(xkey)
+    >>> b58d(x) == xkey, len(B58_CACHE)
+    (True, 0)
+    >>> B58_CACHE.resize(16)
+    >>> b58d(x) == b58d(x,True,78) == xkey
+    True
+    >>> x2 = b58e(xkey[:-2] + '01')
+    >>> s = B58_CACHE.stats()
+    >>> s['size'], s['hits'], s['misses'], s['hitratio']
+    (1, 1, 1, 0.5)
+    >>> b58d(x[:-1] + 'z')
+    Traceback (most recent call last):
+    ...
+    AssertionError
+    >>> x[:-1] + 'z' in B58_CACHE, b58d(x, False) in B58_CACHE
+    (False, False)
+    >>> B58_CACHE.resize(0)
+    >>> B58_CACHE.clear()
+    '''
+    return
+
+
+
+def bech32_py___doctest():
+    '''
+    >>> bech32encode(0, '751e76e8199196d454941c45d1b3a323f1433bd6')
+    'bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4'
+
+    >>> bech32decode('BC1QW508D6QEJXTDG4Y5R3ZARVARY0C5XW7KV8F3T4')
+    (0, '751e76e8199196d454941c45d1b3a323f1433bd6')
+
+    >>> bech32decode('bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t5')
+    (False, False)
+
+    >>> prog = unhexlify('751e76e8199196d454941c45d1b3a323f1433bd6')
+    >>> bech32encode_b(0, prog) == bech32encode(0, hexstrlify(prog))
+    True
+    >>> bech32decode_b('bc1qw508d6qejxtdg4y5r3zarvary0c5xw7kv8f3t4') == (0, prog)
+    True
+    >>> bech32encode(1, 'ab')
+    Traceback (most recent call last):
+    ...
+    AssertionError
+    >>> bech32encode(2, 'ab'*41)
+    Traceback (most recent call last):
+    ...
+    AssertionError
+    >>> bech32encode(2, 'ab'*40)[:4]
+    'bc1z'
+
+    >>> convertbits(bytearray([255]), 8, 5), convertbits([255], 8, 5)
+    ([31, 28], [31, 28])
+    >>> convertbits([31, 28], 5, 8, False), convertbits([31, 29], 5, 8, False)
+    ([255], None)
+    >>> convertbits([4], 2, 3) is None
+    True
     '''
     return
 
@@ -260,6 +688,23 @@ def miscfuncs_py___doctest():
     >>> isitint(4.0)
     False
 
+    >>> c = LRUCache(2)
+    >>> c.put('a', 1); c.put('b', 2)
+    >>> c.get('a')
+    1
+    >>> c.put('c', 3)
+    >>> 'b' in c, 'a' in c, len(c)
+    (False, True, 2)
+    >>> c.get('b', 'missing')
+    'missing'
+    >>> sorted(c.stats().items())
+    [('hitratio', 0.5), ('hits', 1), ('maxsize', 2), ('misses', 1), ('size', 2)]
+    >>> c.resize(0)
+    >>> c.put('d', 4); c.get('d'), len(c)
+    (None, 0)
+    >>> c.clear(); c.hits, c.misses
+    (0, 0)
+
     # Doctest for Py3 doesn't properly handle bytes completely,
     # hence using unhexlify
     >>> hexstrlify(bytes(unhexlify('bbc7f07e59670ffdbb6bbb')))
@@ -396,6 +841,31 @@ def bitcoin_py___doctest():
     >>> compress('04ab27dc61a8d60ceb3a3234e69b818f2df5b79fd67e0ccff474b788ace319fbb86200ed04147c972cf2d74093ff22e6ff37645f794e6254cc7d7aa8bd727aa9c8')
     '02ab27dc61a8d60ceb3a3234e69b818f2df5b79fd67e0ccff474b788ace319fbb8'
 
+    >>> UNCOMPRESS_CACHE.clear()
+    >>> uncompress('02ab27dc61a8d60ceb3a3234e69b818f2df5b79fd67e0ccff474b788ace319fbb8') == \
+    uncompress('02ab27dc61a8d60ceb3a3234e69b818f2df5b79fd67e0ccff474b788ace319fbb8')
+    True
+    >>> UNCOMPRESS_CACHE.hits, UNCOMPRESS_CACHE.misses
+    (1, 1)
+    >>> oldsize = UNCOMPRESS_CACHE.maxsize
+    >>> UNCOMPRESS_CACHE.resize(0)
+    >>> uncompress('02ab27dc61a8d60ceb3a3234e69b818f2df5b79fd67e0ccff474b788ace319fbb8')[-8:]
+    '727aa9c8'
+    >>> UNCOMPRESS_CACHE.stats()['size']
+    0
+    >>> UNCOMPRESS_CACHE.resize(oldsize)
+
+    >>> HASH160_CACHE.resize(16)
+    >>> pubtoaddress('02e3752f728d53e227f789be951fd899e36295c386f6c249940b5c9c275b4f908c')
+    '18o5G4us8k5DscDdyFq1nx8iSE7RFy2euv'
+    >>> PublicKey.fromhex('02e3752f728d53e227f789be951fd899e36295c386f6c249940b5c9c275b4f908c').address()
+    '18o5G4us8k5DscDdyFq1nx8iSE7RFy2euv'
+    >>> s = HASH160_CACHE.stats()
+    >>> s['size'], s['hits'], s['misses']
+    (1, 1, 1)
+    >>> HASH160_CACHE.resize(0)
+    >>> HASH160_CACHE.clear()
+
     >>> privtopub('178f156436f88baaa8a42b41a4ad8d7612711ad1fa277e1d8ac64705d778413d')
     '03ab27dc61a8d60ceb3a3234e69b818f2df5b79fd67e0ccff474b788ace319fbb8'
 
@@ -427,10 +897,29 @@ def bitcoin_py___doctest():
     '178f156436f88baaa8a42b41a4ad8d7612711ad1fa277e1d8ac64705d778413d', False)
     '04fdd25715a72408d662e844027d6deb58b76cb0b9a294ee490191a4ef40df47923efac534afd12d2fcd07c751ef4f6fac9286045df6e9e29608d56efc403a0438'
 
+    >>> multiplypub_sum([( \
+    '04eee3998f3546c061cfedd989cc77280ba2777dff4ed437b00d43dd2942dae003a702ba24e6c79ca23f1890249639c2621f897618d51d633b5039f1f3a4f4e7d4', \
+    '178f156436f88baaa8a42b41a4ad8d7612711ad1fa277e1d8ac64705d778413d'), \
+    ('02eee3998f3546c061cfedd989cc77280ba2777dff4ed437b00d43dd2942dae003', \
+    '0000000000000000000000000000000000000000000000000000000000000001')])
+    '024abeabbdd5de7727bbb2ff5251d57310ef2607dab1e2889f4315474778b466a3'
+
     >>> addpubs('02fdd25715a72408d662e844027d6deb58b76cb0b9a294ee490191a4ef40df4792', \
     '02eee3998f3546c061cfedd989cc77280ba2777dff4ed437b00d43dd2942dae003')
     '024abeabbdd5de7727bbb2ff5251d57310ef2607dab1e2889f4315474778b466a3'
 
+    >>> addpubs_many(['02fdd25715a72408d662e844027d6deb58b76cb0b9a294ee490191a4ef40df4792', \
+    '04eee3998f3546c061cfedd989cc77280ba2777dff4ed437b00d43dd2942dae003a702ba24e6c79ca23f1890249639c2621f897618d51d633b5039f1f3a4f4e7d4'])
+    '024abeabbdd5de7727bbb2ff5251d57310ef2607dab1e2889f4315474778b466a3'
+
+    >>> pubs = [privtopub(dechex(i,32)) for i in range(1,101)]
+    >>> addpubs_many(pubs,False) == privtopub(dechex(5050,32),False)
+    True
+    >>> addpubs_many(pubs + [privtopub(dechex(N-5050,32))])
+    Traceback (most recent call last):
+    ...
+    Exception: Point at infinity.
+
     >>> subtractpubs( \
     '02fdd25715a72408d662e844027d6deb58b76cb0b9a294ee490191a4ef40df4792', \
     '02eee3998f3546c061cfedd989cc77280ba2777dff4ed437b00d43dd2942dae003')
@@ -525,6 +1014,25 @@ def signandverify_py___doctest():
     >>> sign(h,p,k)
     '3045022100e493dbf1c10d80f3581e4904930b1404cc6c13900ee0758474fa94abe8c4cd130220598e37e2e66277ef4d0caf0e32d095debb3c744219508cd394b9747e548662b7'
 
+    >>> pub = privtopub(p)
+    >>> verify(h,sign(h,p,k),pub)
+    True
+    >>> verify(h,sign(h,p,k),uncompress(pub))
+    True
+    >>> verify(h,sign(h,p,5),pub)
+    True
+    >>> verify(h,sign(h,p,k),privtopub(h))
+    False
+    >>> verify(h,'3006020101020100',pub)
+    False
+    >>> verify(h,'3026020101022100' + dechex(N,32),pub)
+    False
+
+    >>> msg = 'Hello, world.'
+    >>> verifymsg(msg,signmsg(msg,p,False,k)) == privtopub(p,False)
+    True
+    >>> verifymsg(msg,'HwAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQEBAQE=')
+    False
 
     >>> h = 'f7011e94125b5bba7f62eb25efe23339eb1637539206c87df3ee61b5ec6b023e'
     >>> sig = '3045022100e493dbf1c10d80f3581e4904930b1404cc6c13900ee0758474fa94abe8c4cd130220598e37e2e66277ef4d0caf0e32d095debb3c744219508cd394b9747e548662b7'
@@ -658,6 +1166,60 @@ def stealth_py___doctest():
 
 
 
+def merkle_py___doctest():
+    '''
+    merkle.py tests:
+
+    Block 100000:
+    >>> txids = ['8c14f0db3df150123e6f3dbbf30f8b955a8249b62ac1d1ff16284aefa3d06d87', \
+    'fff2525b8931402dd09222c50775608f75787bd2b87e56995a7bdd30f79702c4', \
+    '6359f0868171b1d194cbee1af2f16ea598ae8fad666d9b012c8ed2b79a236ec4', \
+    'e9a66845e05d5abc0ad04ec80f774a7e585c6e8db975962d069a522137b80c1d']
+    >>> merkleroot(txids)
+    'f3e94742aca4b5ef85488dc37c06c3282295ffec960994b2c0d5ac2a25a95766'
+    >>> merkleroot(txids[:1]) == txids[0]
+    True
+
+    >>> leaves = [unhexlify(t)[::-1] for t in txids[:3]]
+    >>> root = merkleroot_b(leaves)
+    >>> root == merkleroot_b(iter(leaves)) == merkleroot_b(leaves + leaves[-1:])
+    True
+    >>> r, branch = merklebranch_b(iter(leaves), 2)
+    >>> r == root, branch[0] == leaves[2], len(branch)
+    (True, True, 2)
+    >>> merkleverify_b(leaves[2], branch, 2, root)
+    True
+    >>> merkleverify_b(leaves[1], branch, 2, root)
+    False
+
+    >>> leaves = [sha256_b(unhexlify(dechex(i,4))) for i in range(1000)]
+    >>> root = merkleroot_b(leaves)
+    >>> root == merkleroot_b(iter(leaves))
+    True
+    >>> all(merkleverify_b(leaves[i], merklebranch_b(leaves,i)[1], i, root)
+    ...     for i in (0, 1, 511, 512, 998, 999))
+    True
+    >>> merkleroot_b([])
+    Traceback (most recent call last):
+    ...
+    Exception: No leaves.
+    >>> merkleroot_b(leaves[:3] + [leaves[3][:31]])
+    Traceback (most recent call last):
+    ...
+    AssertionError
+    >>> merkleroot_b(iter([leaves[0] + leaves[1]]))
+    Traceback (most recent call last):
+    ...
+    AssertionError
+    >>> merklebranch_b(leaves, 1000)
+    Traceback (most recent call last):
+    ...
+    Exception: Leaf index out of range.
+    '''
+    return
+
+
+
 def bip32_py___doctest():
     '''
     >>> testvector1 = BIP32('000102030405060708090a0b0c0d0e0f')
@@ -692,6 +1254,18 @@ def bip32_py___doctest():
     Traceback (most recent call last):
     ...
     Exception: Path input indicates a hardened key. Cannot crack up a level from hardened keys.
+
+    >>> B58_CACHE.resize(16)
+    >>> BIP32(testvector1.xpub).child('m/1/2/3') == BIP32.ckd(BIP32.ckd(BIP32.ckd(testvector1.xpub,1),2),3)
+    True
+    >>> B58_CACHE.clear()
+    >>> y = BIP32.ckd(BIP32.ckd(BIP32.ckd(testvector1.xpub,1),2),3)
+    >>> B58_CACHE.hits, B58_CACHE.misses
+    (2, 1)
+    >>> BIP32.ckd(testvector1.xprv,1) in B58_CACHE
+    False
+    >>> B58_CACHE.resize(0)
+    >>> B58_CACHE.clear()
     '''
     return
 
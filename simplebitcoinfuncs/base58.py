@@ -32,69 +32,315 @@ code below.
 
 
 from binascii import hexlify, unhexlify
-import sys, hashlib
+from collections import deque
+from itertools import chain
+import multiprocessing
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport installed
+    ProcessPoolExecutor = None
 try:
     ModuleNotFoundError
 except:
     ModuleNotFoundError = ImportError
 
+try:
+    from .hexhashes import hash256_b
+    from .miscfuncs import LRUCache
+except Exception as e:
+    if type(e) != ImportError and \
+       type(e) != ModuleNotFoundError and \
+       type(e) != ValueError and \
+       type(e) != SystemError:
+        raise Exception("Unknown problem with imports.")
+    from hexhashes import hash256_b
+    from miscfuncs import LRUCache
+
 
 b58_digits = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
 
 
-def b58e(b,check=True):
-    b = unhexlify(b)
-    if check:
-        b = b + hashlib.sha256(hashlib.sha256(b).digest()).digest()[:4]
-    n = int('0x0' + hexlify(b).decode('utf8'), 16)
+# The number is converted 10 base58 digits at a time (58**10 fits in a
+# 64-bit word), so there is one big-int divmod or multiply per 10
+# characters instead of one per character. Inside a chunk the digits
+# are handled two at a time with the lookup tables below.
+
+# Base58Check string -> decoded payload bytes. Extended keys get
+# decoded over and over (BIP32.ckd decodes the key the previous step
+# just encoded, BIP32() re-decodes its input, etc.), so b58decode()
+# checks here first. BIP32.ckd also adds the public keys it encodes.
+# Off by default, since the payloads it holds can be private keys;
+# turn it on with B58_CACHE.resize(n), and use .clear() and .stats()
+# for the hit ratio.
+B58_CACHE = LRUCache(0)
+
+_B58_CHUNK = 58**10
+_B58_PAIRS = [a + b for a in b58_digits for b in b58_digits]
+_B58_PAIRVALUES = dict((p, i) for i, p in enumerate(_B58_PAIRS))
+
+try:
+    _b2i = lambda b: int.from_bytes(b,'big')
+    _i2b = lambda n: n.to_bytes((n.bit_length() + 7) // 8,'big')
+    _i2bfixed = lambda n, length: n.to_bytes(length,'big')
+    _b2i(b'\x01')
+except AttributeError:
+    _b2i = lambda b: int('0' + hexlify(b), 16)
+    def _i2b(n):
+        h = '%x' % n if n else ''
+        return unhexlify(('0' + h) if len(h) % 2 else h)
+    def _i2bfixed(n, length):
+        h = '%0*x' % (2 * length, n)
+        if len(h) > 2 * length:
+            raise OverflowError("int too big to convert")
+        return unhexlify(h)
+
+
+def _b58chunks(rs):
+    # 10-digit chunk values, most significant first -> base58 string
+    P = _B58_PAIRS
     res = []
-    while n > 0:
-        n, r = divmod(n, 58)
-        res.append(b58_digits[r])
-    res = ''.join(res[::-1])
-    
-    # "1" is prepended, since "0" isn't in the base58 alphabet
-    czero = b'\x00'
-    if sys.version_info[0] > 2:
-        czero = 0
-    pad = 0
-    for c in b:
-        if c == czero: pad += 1
-        else: break
-    o = b58_digits[0] * pad + res
-    # 
-
-    try:  o = str(o,'ascii')
-    except:  pass
-    return o
+    for r in rs:
+        r, p5 = divmod(r, 3364)
+        r, p4 = divmod(r, 3364)
+        r, p3 = divmod(r, 3364)
+        p1, p2 = divmod(r, 3364)
+        res.extend((P[p1], P[p2], P[p3], P[p4], P[p5]))
+    return ''.join(res).lstrip(b58_digits[0])
 
 
-def b58d(s,check=True):
-    assert s
+def _b58toint(s):
+    # Leading 1s are zeros, so padding with them lines s up with the
+    # 10-digit chunks without changing its value
+    t = b58_digits[0] * (-len(s) % 10) + s
     n = 0
-    for c in s:
-        n *= 58
-        if c not in b58_digits:
-            raise Exception('Character %r is not a valid base58 character' % c)
-        digit = b58_digits.index(c)
-        n += digit
-    h = '%x' % n
-    if len(h) % 2:
-        h = '0' + h
-    res = unhexlify(h.encode('utf8'))
-    pad = 0
-
-    for c in s[:-1]:
-        if c == b58_digits[0]: pad += 1
-        else: break
-    o = b'\x00' * pad + res
+    pv = _B58_PAIRVALUES
+    try:
+        for i in range(0, len(t), 10):
+            n = n * _B58_CHUNK + (((pv[t[i:i+2]] * 3364 + pv[t[i+2:i+4]])
+                                   * 3364 + pv[t[i+4:i+6]]) * 3364
+                                  + pv[t[i+6:i+8]]) * 3364 + pv[t[i+8:i+10]]
+    except KeyError:
+        for c in s:
+            if c not in b58_digits:
+                raise Exception('Character %r is not a valid base58 character' % c)
+        raise
+    return n
+
+
+def b58encode(b,check=True):
+    '''
+    Bytes-like input, base58 string output.
+    '''
+
+    return _b58encode(bytes(bytearray(b)),check)
+
+
+def b58decode(s,check=True,length=None):
+    '''
+    Base58 string input, bytes output.
+
+    If the length of the decoded payload is known ahead of time (not
+    counting the checksum), passing it in lets a Base58Check string
+    take the fixed-length path below.
+    '''
+
+    assert s
+    if not check:
+        return _b58decode(s,False,length)
+    o = B58_CACHE.get(s)
+    if o is None:
+        o = _b58decode(s,True,length)
+        B58_CACHE.put(s,o)
+    return o
+
+
+def _b58encode(b,check):
+    if check:
+        if len(b) in _B58_FIXED:
+            return _b58check_fixed(b, _B58_FIXED[len(b)])
+        b = b + hash256_b(b)[:4]
+    n = _b2i(b)
+    chunks = []
+    while n:
+        n, r = divmod(n, _B58_CHUNK)
+        chunks.append(r)
+    res = _b58chunks(reversed(chunks))
+
+    # "1" is prepended for each leading zero byte, since "0" isn't in
+    # the base58 alphabet
+    pad = len(b) - len(b.lstrip(b'\x00'))
+    return str(b58_digits[0] * pad + res)
+
 
+def _b58decode(s,check,length):
+    if check and length is not None:
+        o = _b58decodecheck_fixed(s, length)
+        if o is not None:
+            return o
+    n = _b58toint(s)
+    pad = len(s) - len(s.lstrip(b58_digits[0]))
+    o = b'\x00' * pad + _i2b(n)
     if check:
-        assert hashlib.sha256(hashlib.sha256(o[:-4]).digest()).digest()[:4] == o[-4:]
-        return str(hexlify(o[:-4])) \
-               .rstrip("'").replace("b'","",1).replace("'","")
+        assert hash256_b(o[:-4])[:4] == o[-4:]
+        return o[:-4]
+    return o
+
+
+# Fixed-length Base58Check
+#
+# Nearly everything is one of a few shapes: 21-byte address payloads,
+# 33/34-byte WIF keys and 78-byte BIP32 keys. For a known length the
+# number of 10-digit chunks is fixed, so the encoder splits off exactly
+# that many with no loop test, and the decoder gets the leading zero
+# bytes for free from a fixed-width int-to-bytes conversion instead of
+# counting and prepending them. b58encode() dispatches on the payload
+# length by itself; b58decode() needs to be told the length.
+
+# Payload length -> number of 10-digit chunks that always fits it,
+# checksum included
+_B58_FIXED = {}
+for _n in (21, 33, 34, 78):
+    _B58_FIXED[_n] = 1
+    while _B58_CHUNK ** _B58_FIXED[_n] < 256 ** (_n + 4):
+        _B58_FIXED[_n] += 1
+del _n
+
+
+def _b58check_fixed(b, k):
+    b = b + hash256_b(b)[:4]
+    n = _b2i(b)
+    rs = [0] * k
+    for i in range(k - 1, 0, -1):
+        n, rs[i] = divmod(n, _B58_CHUNK)
+    rs[0] = n
+    res = _b58chunks(rs)
+    if b[:1] != b'\x00':
+        return str(res)
+    pad = len(b) - len(b.lstrip(b'\x00'))
+    return str(b58_digits[0] * pad + res)
+
+
+def _b58decodecheck_fixed(s, length):
+    # Returns None if s doesn't decode to exactly length + 4 bytes, so
+    # the caller can fall back to the general decoder.
+    n = _b58toint(s)
+    try:
+        o = _i2bfixed(n, length + 4)
+    except OverflowError:
+        return None
+    if s[:1] == b58_digits[0] or o[:1] == b'\x00':
+        # The leading zero bytes have to match the leading 1s exactly
+        if len(s) - len(s.lstrip(b58_digits[0])) != \
+           length + 4 - len(o.lstrip(b'\x00')):
+            return None
+    assert hash256_b(o[:-4])[:4] == o[-4:]
+    return o[:-4]
+
+
+def b58e(b,check=True):
+    return b58encode(unhexlify(b),check)
+
+
+def b58d(s,check=True,length=None):
+    return str(hexlify(b58decode(s,check,length)).decode('ascii'))
+
+
+def b58check_valid(s):
+    '''
+    Checks a Base58Check string without decoding it into hex. Returns
+    the version byte as a 2-char hex string if it's valid, or False.
+    '''
+
+    try:
+        n = _b58toint(s)
+    except Exception:
+        return False
+    pad = len(s) - len(s.lstrip(b58_digits[0]))
+    o = b'\x00' * pad + _i2b(n)
+    if len(o) < 5 or hash256_b(o[:-4])[:4] != o[-4:]:
+        return False
+    return str(hexlify(o[:1]).decode('ascii'))
+
+
+# Below this many lines, starting a process pool costs more than it saves
+VALIDATE_THRESHOLD = 50000
+
+
+def _validatechunk(lines):
+    return [b58check_valid(l) for l in lines]
+
+
+def b58check_validate_lines(lines, processes=None, chunksize=10000,
+                            threshold=None):
+    '''
+    Validates an iterable of Base58Check strings (e.g. an open file of
+    addresses, one per line) and yields (line number, stripped line,
+    b58check_valid() result) for each one, in order, as it goes. Once
+    the input runs past threshold lines (default VALIDATE_THRESHOLD),
+    the work is split into chunksize-line pieces across a process pool,
+    with only a few pieces in flight at a time, so the input is never
+    read into memory all at once. Use processes=1 to stay in this
+    process.
+    '''
+
+    def chunks():
+        chunk = []
+        for line in lines:
+            chunk.append(line.strip())
+            if len(chunk) == chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    if threshold is None:
+        threshold = VALIDATE_THRESHOLD
+    pending = chunks()
+    usepool = False
+    if ProcessPoolExecutor is not None and processes != 1:
+        # Read ahead just far enough to tell whether a pool is worth it
+        head = []
+        count = 0
+        for chunk in pending:
+            head.append(chunk)
+            count += len(chunk)
+            if count > threshold:
+                usepool = True
+                break
+        pending = chain(head, pending)
+
+    lineno = 0
+    if not usepool:
+        for chunk in pending:
+            for l, v in zip(chunk, _validatechunk(chunk)):
+                lineno += 1
+                yield lineno, l, v
+        return
+    if not processes:
+        processes = multiprocessing.cpu_count()
+    with ProcessPoolExecutor(processes) as ex:
+        inflight = deque()
+        while True:
+            for chunk in pending:
+                inflight.append((chunk, ex.submit(_validatechunk, chunk)))
+                if len(inflight) >= 2 * processes:
+                    break
+            if not inflight:
+                break
+            chunk, f = inflight.popleft()
+            for l, v in zip(chunk, f.result()):
+                lineno += 1
+                yield lineno, l, v
+
 
-    else:
-        return str(hexlify(o)) \
-               .rstrip("'").replace("b'","",1).replace("'","")
+def b58check_validate_file(path, processes=None, chunksize=10000,
+                           threshold=None):
+    '''
+    b58check_validate_lines() over the lines of a text file.
+    '''
 
+    with open(path) as f:
+        for r in b58check_validate_lines(f, processes, chunksize,
+                                         threshold):
+            yield r
@@ -46,17 +46,28 @@ except Exception as e:
 
 
 CHARSET = "qpzry9x8gf2tvdw0s3jn54khce6mua7l"
+_CHARSET_REV = dict((c, i) for i, c in enumerate(CHARSET))
+
+_GENERATOR = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+
+# XOR of the generator terms for every possible 5-bit top value, so the
+# polymod step is one lookup instead of five tests
+_POLYMOD_TABLE = []
+for _top in range(32):
+    _t = 0
+    for _i in range(5):
+        if (_top >> _i) & 1:
+            _t ^= _GENERATOR[_i]
+    _POLYMOD_TABLE.append(_t)
+del _top, _t, _i
 
 
 def bech32_polymod(values):
     """Internal function that computes the Bech32 checksum."""
-    generator = [0x3b6a57b2, 0x26508e6d, 0x1ea119fa, 0x3d4233dd, 0x2a1462b3]
+    table = _POLYMOD_TABLE
     chk = 1
     for value in values:
-        top = chk >> 25
-        chk = (chk & 0x1ffffff) << 5 ^ value
-        for i in range(5):
-            chk ^= generator[i] if ((top >> i) & 1) else 0
+        chk = ((chk & 0x1ffffff) << 5 ^ value) ^ table[chk >> 25]
     return chk
 
 
@@ -92,10 +103,11 @@ def bech32_decode(bech):
     pos = bech.rfind('1')
     if pos < 1 or pos + 7 > len(bech) or len(bech) > 90:
         return (None, None)
-    if not all(x in CHARSET for x in bech[pos+1:]):
+    try:
+        data = [_CHARSET_REV[x] for x in bech[pos+1:]]
+    except KeyError:
         return (None, None)
     hrp = bech[:pos]
-    data = [CHARSET.find(x) for x in bech[pos+1:]]
     if not bech32_verify_checksum(hrp, data):
         return (None, None)
     return (hrp, data[:-6])
@@ -103,6 +115,13 @@ def bech32_decode(bech):
 
 def convertbits(data, frombits, tobits, pad=True):
     """General power-of-2 base conversion."""
+    if isinstance(data, (bytes, bytearray)):
+        data = bytearray(data)
+        if frombits == 8 and tobits == 5:
+            return _bytesto5(data, pad)
+    elif frombits == 5 and tobits == 8 and not pad:
+        o = _5tobytes(data)
+        return None if o is None else list(bytearray(o))
     acc = 0
     bits = 0
     ret = []
@@ -124,6 +143,47 @@ def convertbits(data, frombits, tobits, pad=True):
     return ret
 
 
+# The segwit cases (8 -> 5 bits to encode, 5 -> 8 without padding to
+# decode) go through one big int instead of a bit accumulator loop
+
+try:
+    _b2i = lambda b: int.from_bytes(bytes(b),'big')
+    _i2b = lambda n, length: n.to_bytes(length,'big')
+    _b2i(b'\x01')
+except AttributeError:
+    _b2i = lambda b: int('0' + hexlify(b), 16)
+    _i2b = lambda n, length: unhexlify('%0*x' % (2 * length, n))
+
+
+def _bytesto5(data, pad=True):
+    n = _b2i(data)
+    bits = 8 * len(data)
+    extra = bits % 5
+    if extra and pad:
+        n <<= 5 - extra
+        bits += 5 - extra
+    elif extra:
+        if n & ((1 << extra) - 1):
+            return None
+        n >>= extra
+        bits -= extra
+    return [(n >> i) & 31 for i in range(bits - 5, -1, -5)]
+
+
+def _5tobytes(data):
+    # Unpadded 5 -> 8 bit conversion, returning bytes, or None if the
+    # leftover padding isn't valid
+    n = 0
+    for value in data:
+        if value < 0 or value >> 5:
+            return None
+        n = n << 5 | value
+    extra = 5 * len(data) % 8
+    if extra >= 5 or n & ((1 << extra) - 1):
+        return None
+    return _i2b(n >> extra, 5 * len(data) // 8)
+
+
 def decode(hrp, addr):
     """Decode a segwit address."""
     hrpgot, data = bech32_decode(addr)
@@ -141,26 +201,25 @@ def decode(hrp, addr):
 
 def encode(hrp, witver, witprog):
     """Encode a segwit address."""
-    ret = bech32_encode(hrp, [witver] + convertbits(witprog, 8, 5))
-    assert decode(hrp, ret) is not (None, None)
-    return ret
+    return bech32_encode(hrp, [witver] + convertbits(witprog, 8, 5))
 
 
 
 # My stupid simple wrappers for the above code
 
 
-def bech32encode(witnessversion, witnessprogram, testnet=False): # Version is int, program is hexstr
+def bech32encode_b(witnessversion, witnessprogram, testnet=False): # Version is int, program is bytes
     assert witnessversion >= 0 and witnessversion <= 16
+    assert len(witnessprogram) >= 2 and len(witnessprogram) <= 40
     if witnessversion == 0:
-        assert len(witnessprogram) == 40 or len(witnessprogram) == 64
+        assert len(witnessprogram) == 20 or len(witnessprogram) == 32
     if testnet:
-        return strlify(encode("tc", witnessversion, bytearray(unhexlify(witnessprogram))).lower())
+        return str(encode("tc", witnessversion, bytearray(witnessprogram)))
     else:
-        return strlify(encode("bc", witnessversion, bytearray(unhexlify(witnessprogram))).lower())
+        return str(encode("bc", witnessversion, bytearray(witnessprogram)))
 
 # Be careful about error-checking using the False returns, since witver returns 0 on a success
-def bech32decode(text):
+def bech32decode_b(text): # Returns (version int, program bytes)
     text = strlify(text.lower().encode("utf-8"))
     assert text[:3] == "bc1" or text[:3] == "tc1"
     witver, wit_ordnallist = decode(text[:2], text)
@@ -169,7 +228,15 @@ def bech32decode(text):
     assert witver >= 0 and witver <= 16
     if witver == 0:
         assert len(wit_ordnallist) == 20 or len(wit_ordnallist) == 32
-    o = ""
-    for ordinal in wit_ordnallist:
-        o += dechex(ordinal, 1)
-    return witver, o
+    return witver, bytes(bytearray(wit_ordnallist))
+
+
+def bech32encode(witnessversion, witnessprogram, testnet=False): # Version is int, program is hexstr
+    return bech32encode_b(witnessversion, unhexlify(witnessprogram), testnet)
+
+
+def bech32decode(text):
+    witver, prog = bech32decode_b(text)
+    if prog is False:
+        return False, False
+    return witver, hexstrlify(prog)
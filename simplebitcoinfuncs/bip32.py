@@ -31,6 +31,10 @@ except Exception as e:
     from bitcoin import *
 
 
+# HMAC-SHA512 keyed with the master key generation constant
+SEED_MIDSTATE = hmacmidstate(bytearray("Bitcoin seed",'utf-8'))
+
+
 class BIP32(object):
     '''
     A simple object to hold info on a BIP0032 key, as well as a few
@@ -68,12 +72,12 @@ class BIP32(object):
             self.xprv = BIP32.genmaster(a,istestnet)
             self.xpub = BIP32.xprvtoxpub(self.xprv)
         if ispub:
-            self.deserialized = b58d(self.xpub)
+            self.deserialized = b58d(self.xpub,True,78)
             self.priv = False
             self.wif = False
             self.pub = self.deserialized[-66:]
         else:
-            self.deserialized = b58d(self.xprv)
+            self.deserialized = b58d(self.xprv,True,78)
             self.priv = self.deserialized[-64:]
             self.pub = privtopub(self.priv,True)
             self.wif = b58e('80' + self.priv + '01')
@@ -81,8 +85,9 @@ class BIP32(object):
         self.chaincode = self.deserialized[-130:-66]
         self.parentfpr = self.deserialized[10:18]
         self.version = self.deserialized[:8]
-        self.fpr = hash160(self.pub)[:8]
-        self.addr = b58e('00' + hash160(self.pub))
+        h = hexstrlify(pubhash160_b(unhexlify(self.pub)))
+        self.fpr = h[:8]
+        self.addr = b58e('00' + h)
         self.depth = int(self.deserialized[8:10],16)
         self.index = int(self.deserialized[18:26],16)
 
@@ -119,11 +124,15 @@ class BIP32(object):
 
     @staticmethod
     def ckd(key, i):
-        key = b58d(key)
+        key = b58d(key,True,78)
         assert int(key[8:10],16) < 255
         i = int(i)
         assert i >= 0 and i <= 4294967295
         ihex = dechex(i,4)
+        if key[-66:-64] != '00':
+            parentpub = PublicKey.fromhex(key[-66:])
+        else:
+            parentpub = PublicKey.frompriv(key[-64:])
         if i >= 2147483648:
             if key[-66:-64] != '00' or key[:8] == '043587cf' or key[:8] == '0488b21e':
                 raise Exception('Cannot derive hardened child from public parent key.')
@@ -131,30 +140,28 @@ class BIP32(object):
                            unhexlify('00' + key[-64:] + ihex), \
                            hashlib.sha512).digest())
         else:
-            if key[-66:-64] != '00' or key[:8] == '043587cf' or key[:8] == '0488b21e':
-                o = hexstrlify(hmac.new(unhexlify(key[-130:-66]), \
-                               unhexlify(key[-66:] + ihex), \
-                               hashlib.sha512).digest())
-            else:
-                o = hexstrlify(hmac.new(unhexlify(key[-130:-66]), \
-                               unhexlify(privtopub(key[-64:],True) + ihex), \
-                               hashlib.sha512).digest())
+            o = hexstrlify(hmac.new(unhexlify(key[-130:-66]), \
+                           parentpub.tobytes() + unhexlify(ihex), \
+                           hashlib.sha512).digest())
         x = int(o[:64],16)
         assert x > 0 and x < N
 
         if key[-66:-64] != '00':
-            newkey = addpubs(key[-66:],privtopub(o[:64],False),True)
-            keyfpr = hash160(key[-66:])[:8]
+            newkey = (parentpub + PublicKey.fromscalar(x)).tohex()
         else:
             newkey = '00' + addprivkeys(key[-64:],o[:64])
-            keyfpr = hash160(privtopub(key[-64:],True))[:8]
-        return b58e(key[:8] + dechex(int(key[8:10],16) + 1,1) + \
-                    keyfpr + ihex + o[64:] + newkey)
+        keyfpr = parentpub.hash160()[:8]
+        child = unhexlify(key[:8] + dechex(int(key[8:10],16) + 1,1) + \
+                          keyfpr + ihex + o[64:] + newkey)
+        o = b58encode(child)
+        if newkey[:2] != '00':
+            # The next derivation step will decode this right back
+            B58_CACHE.put(o,child)
+        return o
 
     @staticmethod
     def genmaster(a,istestnet=False):
-        o = hexstrlify(hmac.new(bytearray("Bitcoin seed",'utf-8'),
-                                unhexlify(a),hashlib.sha512).digest())
+        o = hexstrlify(SEED_MIDSTATE.digest(unhexlify(a)))
         if istestnet:
             version = '04358394'
         else:
@@ -165,7 +172,7 @@ class BIP32(object):
 
     @staticmethod
     def xprvtoxpub(a):
-        a = b58d(a)
+        a = b58d(a,True,78)
         if a[:8] == '04358394':
             version = '043587cf'
         elif a[:8] == '0488ade4':
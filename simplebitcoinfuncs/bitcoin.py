@@ -29,6 +29,77 @@ except Exception as e:
     from miscbitcoinfuncs import *
 
 
+# Compressed pubkey hex -> (x, y). Decompressing needs a 256-bit modular
+# square root, and the same keys tend to come up over and over (verify
+# against a handful of known keys, etc.). Use UNCOMPRESS_CACHE.resize()
+# to change the size or resize(0) to turn it off, and .stats() for the
+# hit/miss counters.
+UNCOMPRESS_CACHE = LRUCache(4096)
+
+# Raw pubkey bytes -> raw hash160, for code that turns the same keys
+# into fingerprints and addresses over and over (BIP32 derivation,
+# address indexes). Off by default; turn it on with
+# HASH160_CACHE.resize(n), and use .clear() and .stats() as above.
+HASH160_CACHE = LRUCache(0)
+
+
+def pubhash160_b(pub):
+    '''
+    hash160_b() of a public key given as raw bytes, through
+    HASH160_CACHE.
+    '''
+
+    h = HASH160_CACHE.get(pub)
+    if h is None:
+        h = hash160_b(pub)
+        HASH160_CACHE.put(pub,h)
+    return h
+
+
+class PublicKey(Point):
+    '''
+    A Point that is used as a public key. The hex functions below are
+    thin wrappers around it, so code that does several operations in a
+    row can use it directly and skip the hex in between:
+
+    >>> pub = PublicKey.fromhex('02eee3998f3546c061cfedd989cc77280ba2777dff4ed437b00d43dd2942dae003')
+    >>> (pub * int('178f156436f88baaa8a42b41a4ad8d7612711ad1fa277e1d8ac64705d778413d',16)).tohex()
+    '02fdd25715a72408d662e844027d6deb58b76cb0b9a294ee490191a4ef40df4792'
+    '''
+
+    __slots__ = ()
+
+    @classmethod
+    def fromhex(cls, pub):
+        '''
+        Same as Point.fromhex(), but compressed keys go through
+        UNCOMPRESS_CACHE.
+        '''
+
+        if len(pub) != 66:
+            return super(PublicKey, cls).fromhex(pub)
+        xy = UNCOMPRESS_CACHE.get(pub)
+        if xy is None:
+            o = super(PublicKey, cls).fromhex(pub)
+            UNCOMPRESS_CACHE.put(pub, (o.X, o.Y))
+            return o
+        return cls(xy[0], xy[1])
+
+    @classmethod
+    def frompriv(cls, priv):
+        '''
+        Input must be 64-char hex string
+        '''
+
+        return cls.fromscalar(int(priv,16))
+
+    def hash160(self, compressed=True):
+        return hexstrlify(pubhash160_b(self.tobytes(compressed)))
+
+    def address(self, prefix='00', compressed=True):
+        return b58e(prefix + self.hash160(compressed))
+
+
 def uncompress(pub):
     '''
     Input must be hex string, and a valid compressed public key.
@@ -36,15 +107,7 @@ def uncompress(pub):
     function below, and then verify that the str len is 66.
     '''
 
-    yp = int(pub[:2],16) - 2
-    x = int(pub[2:],16)
-    a = (pow_mod(x,3,P) + 7) % P
-    y = pow_mod(a, (P+1)//4, P)
-    if y % 2 != yp:
-        y = -y % P
-    x = dechex(x,32)
-    y = dechex(y,32)
-    return '04' + x + y
+    return PublicKey.fromhex(pub).tohex(False)
 
 
 def compress(pub):
@@ -54,13 +117,7 @@ def compress(pub):
     function below, and then verify that the str len is 130.
     '''
 
-    x = pub[2:66]
-    y = pub[66:]
-    if int(y,16) % 2:
-        o = str('03') + str(x)
-    else:
-        o = str('02') + str(x)
-    return o
+    return PublicKey.fromhex(pub).tohex(True)
 
 
 def privtopub(priv,outcompressed=True):
@@ -68,14 +125,7 @@ def privtopub(priv,outcompressed=True):
     Input must be 64-char hex string
     '''
 
-    x, y = ecmultiply(Gx,Gy,int(priv,16))
-    x = dechex(x,32)
-    y = dechex(y,32)
-    o = '04' + x + y
-    if outcompressed:
-        return compress(o)
-    else:
-        return o
+    return PublicKey.frompriv(priv).tohex(outcompressed)
 
 
 def addprivkeys(p1,p2):
@@ -113,16 +163,22 @@ def multiplypub(pub,priv,outcompressed=True):
     public key does not do anything or matter in any way.
     '''
 
-    if len(pub) == 66:
-        pub = uncompress(pub)
-    x, y = ecmultiply(int(pub[2:66],16),int(pub[66:],16),int(priv,16))
-    x = dechex(x,32)
-    y = dechex(y,32)
-    o = '04' + x + y
-    if outcompressed:
-        return compress(o)
-    else:
-        return o
+    return (PublicKey.fromhex(pub) * int(priv,16)).tohex(outcompressed)
+
+
+def multiplypub_sum(pairs,outcompressed=True):
+    '''
+    Input is an iterable of (pubkey, privkey) pairs, in the same
+    formats multiplypub() takes. Returns the sum of pub*priv over all
+    pairs, computed as one multi-scalar multiplication instead of a
+    multiplypub() per pair and a chain of addpubs().
+    '''
+
+    terms = []
+    for pub, priv in pairs:
+        x, y = PublicKey.fromhex(pub).affine()
+        terms.append((x,y,int(priv,16)))
+    return PublicKey(*ecmultiply_sum(terms,True)).tohex(outcompressed)
 
 
 def addpubs(p1,p2,outcompressed=True):
@@ -134,19 +190,20 @@ def addpubs(p1,p2,outcompressed=True):
     outcompressed bool dictates the compression of the output.
     '''
 
-    if len(p1) == 66:
-        p1 = uncompress(p1)
-    if len(p2) == 66:
-        p2 = uncompress(p2)
-    x, y = ecadd(int(p1[2:66],16),int(p1[66:],16),
-                 int(p2[2:66],16),int(p2[66:],16))
-    x = dechex(x,32)
-    y = dechex(y,32)
-    o = '04' + x + y
-    if outcompressed:
-        return compress(o)
-    else:
-        return o
+    return (PublicKey.fromhex(p1) + PublicKey.fromhex(p2)).tohex(outcompressed)
+
+
+def addpubs_many(pubs,outcompressed=True):
+    '''
+    Input is an iterable of pubkey hex strings, in the same formats
+    addpubs() takes. Returns their sum, added up in Jacobian form so
+    there is only one inversion and one hex conversion for the whole
+    lot instead of one per addpubs() call.
+    '''
+
+    pts = (PublicKey.fromhex(p) for p in pubs)
+    Q = ecadd_many(((p.X, p.Y, p.Z) for p in pts),True)
+    return PublicKey(*Q).tohex(outcompressed)
 
 
 def subtractpubs(p1,p2,outcompressed=True):
@@ -158,23 +215,11 @@ def subtractpubs(p1,p2,outcompressed=True):
     outcompressed bool dictates the compression of the output.
     '''
 
-    if len(p1) == 66:
-        p1 = uncompress(p1)
-    if len(p2) == 66:
-        p2 = uncompress(p2)
-    x, y = ecsubtract(int(p1[2:66],16),int(p1[66:],16),
-                      int(p2[2:66],16),int(p2[66:],16))
-    x = dechex(x,32)
-    y = dechex(y,32)
-    o = '04' + x + y
-    if outcompressed:
-        return compress(o)
-    else:
-        return o
+    return (PublicKey.fromhex(p1) - PublicKey.fromhex(p2)).tohex(outcompressed)
 
 
 def pubtoaddress(pub,prefix='00'):
-    return b58e(prefix + hash160(pub))
+    return b58e(prefix + hexstrlify(pubhash160_b(unhexlify(pub))))
 
 
 def pubtosegwit(pub, isredeemscript=False, witnessversion=0,
@@ -182,14 +227,14 @@ def pubtosegwit(pub, isredeemscript=False, witnessversion=0,
     assert witnessversion >= 0 and witnessversion <= 16
     if isredeemscript is False:
         assert validatepubkey(pub) is not False and len(pub) == 66
-        pubhash = hash160(pub)
+        pubhash = hexstrlify(pubhash160_b(unhexlify(pub)))
     else:
-        pubhash = hash256(pub)
+        pubhash = hexstrlify(hash256_b(unhexlify(pub)))
     witprog = dechex(witnessversion,1) + dechex(len(pubhash)//2,1) + pubhash
     if returnprogram:
         return witprog
     if returnp2sh:
-        return b58e("05" + hash160(witprog))
+        return b58e("05" + hexstrlify(hash160_b(unhexlify(witprog))))
     else:
         return bech32encode(witnessversion, pubhash)
 
@@ -232,7 +277,7 @@ def wiftohex(wifkey):
     for c in wifkey:
         if c not in b58_digits:
             raise Exception("Not WIF")
-    key = b58d(wifkey)
+    key = b58d(wifkey,True,34 if len(wifkey) == 52 else 33)
     prefix, key = key[:2], key[2:] 
     if len(key) == 66:
         assert key[-2:] == '01'
@@ -309,20 +354,16 @@ class Coin(object):
             self.priv = False
             self.wifc = False
             self.wifu = False
-            if len(key) == 130:
-                self.pubu = key
-                self.pubc = compress(key)
-            else:
-                self.pubc = key
-                self.pubu = uncompress(key)
+            pub = PublicKey.fromhex(key)
         else:
             self.priv = key
             self.wifc = b58e(privprefix + key + '01')
             self.wifu = b58e(privprefix + key)
-            self.pubu = privtopub(key,False)
-            self.pubc = compress(self.pubu)
-        self.hash160c = hash160(self.pubc)
-        self.hash160u = hash160(self.pubu)
+            pub = PublicKey.frompriv(key)
+        self.pubu = pub.tohex(False)
+        self.pubc = pub.tohex(True)
+        self.hash160c = pub.hash160(True)
+        self.hash160u = pub.hash160(False)
         self.privprefix = privprefix
         if pubprefix == False:
             assert int(privprefix,16) > 127 and int(privprefix,16) < 256
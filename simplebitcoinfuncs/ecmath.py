@@ -30,6 +30,16 @@ don't understand the math at any relevent level.
 '''
 
 
+import os
+import sys
+import mmap
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from binascii import hexlify, unhexlify
+
+
 # Prime field (2**256 - 2**32 - 2**9 - 2**8 - 2**7 - 2**6 - 2**4 -1)
 P = 115792089237316195423570985008687907853269984665640564039457584007908834671663
 
@@ -48,9 +58,31 @@ Gy = 326705100207588169780830851305070431844712733806592432759389043357573374824
 # ("KwDiBf89QgGbjEhKnhXJuH7LrciVrZi3qYjgd9M7rFU73sVHnoWn", "1BgGZ9tcN4rm9KBzDn7KprQz87SZ26SAMH")
 
 
-def modinv(a,n=P):
+# Big-integer backend
+#
+# All the field math goes through _mpz(), _modinv() and _powmod(). The
+# default 'python' backend uses plain ints and the builtin pow(),
+# including pow(a, -1, n) for inverses where the Python version has
+# it. The 'gmpy2' backend uses gmpy2's mpz, invert() and powmod(), which
+# are a good deal faster for 256-bit numbers.
+#
+# The backend is chosen at import time: gmpy2 if it is installed,
+# otherwise python. Setting the SIMPLEBITCOINFUNCS_BACKEND environment
+# variable to 'python' or 'gmpy2' overrides that, and setbackend() can
+# switch at run time. Public functions always return plain ints, so
+# nothing outside this file ever sees an mpz.
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+def _modinv_euclid(a,n):
     lm, hm = 1, 0
     low, high = a % n, n
+    if low == 0:
+        raise ZeroDivisionError("No inverse exists.")
     while low > 1:
         ratio = high // low
         nm, new = hm - lm*ratio, high - low*ratio
@@ -58,6 +90,60 @@ def modinv(a,n=P):
     return lm % n
 
 
+def _modinv_builtin(a,n):
+    try:
+        return pow(a,-1,n)
+    except ValueError:
+        raise ZeroDivisionError("No inverse exists.")
+
+
+try:
+    pow(2,-1,5)
+    _modinv_pow = _modinv_builtin
+except (TypeError, ValueError):
+    # pow() only takes a negative exponent from Python 3.8
+    _modinv_pow = _modinv_euclid
+
+
+BACKENDS = ('python', 'gmpy2')
+
+
+def setbackend(name):
+    '''
+    Switches the backend. Cached point tables are dropped, so they get
+    rebuilt with the new backend's numbers the next time they are used.
+    '''
+
+    global BACKEND, _mpz, _modinv, _powmod
+    global _basetable, _gwnaftable, _gwnafglvtable
+    if name == 'gmpy2':
+        if gmpy2 is None:
+            raise ImportError("gmpy2 backend requested but gmpy2 is not installed.")
+        _mpz, _modinv, _powmod = gmpy2.mpz, gmpy2.invert, gmpy2.powmod
+    elif name == 'python':
+        _mpz, _modinv, _powmod = int, _modinv_pow, pow
+    else:
+        raise Exception("Unknown backend: %s" % str(name))
+    BACKEND = name
+    # A loadbasetable() mapping is closed rather than left to the GC.
+    # (On the first call, at import, the table globals don't exist yet.)
+    if hasattr(globals().get('_basetable'), 'close'):
+        _basetable.close()
+    _basetable = _gwnaftable = _gwnafglvtable = None
+
+
+def getbackend():
+    return BACKEND
+
+
+setbackend(os.environ.get('SIMPLEBITCOINFUNCS_BACKEND',
+                          'python' if gmpy2 is None else 'gmpy2'))
+
+
+def modinv(a,n=P):
+    return int(_modinv(a,n))
+
+
 def ecadd(xp,yp,xq,yq):
     m = ((yq-yp) * modinv(xq-xp,P)) % P
     xr = (m*m-xp-xq) % P
@@ -78,7 +164,13 @@ def ecdouble(xp,yp):
     return xr, yr
 
 
-def ecmultiply(xs,ys,scalar):
+def ecmultiply_affine(xs,ys,scalar):
+    '''
+    Reference double-and-add multiplication using the affine functions
+    above. Every step costs a modinv(), so it is slow, but it is easy
+    to follow and is kept around to check the Jacobian code against.
+    '''
+
     if scalar == 0 or scalar >= N:
         raise Exception("Invalid scalar.")
     scalarbin = str(bin(scalar)).lstrip('0b')
@@ -90,12 +182,958 @@ def ecmultiply(xs,ys,scalar):
     return Qx, Qy
 
 
+# Jacobian coordinates
+#
+# A point (X, Y, Z) represents the affine point (X/Z**2, Y/Z**3).
+# Adding and doubling in this form needs no modinv() at all, so a
+# whole scalar multiplication only pays for a single inversion, in
+# to_affine() at the very end. Z == 0 is the point at infinity.
+
+JACOBIAN_INFINITY = (1, 1, 0)
+
+
+def to_jacobian(x,y):
+    return (x, y, 1)
+
+
+def to_affine(X,Y,Z):
+    if Z == 0:
+        raise Exception("Point at infinity.")
+    zinv = _modinv(Z,P)
+    zinv2 = (zinv * zinv) % P
+    return int((X * zinv2) % P), int((Y * zinv2 * zinv) % P)
+
+
+def _batch_modinv(values,n):
+    values = [_mpz(v) % n for v in values]
+    prefix = []
+    acc = _mpz(1)
+    for v in values:
+        prefix.append(acc)
+        if v:
+            acc = (acc * v) % n
+    inv = _modinv(acc,n)
+    out = [0] * len(values)
+    for i in range(len(values) - 1, -1, -1):
+        v = values[i]
+        if v:
+            out[i] = (inv * prefix[i]) % n
+            inv = (inv * v) % n
+    return out
+
+
+def _batch_affine(points):
+    # Same as batch_to_affine(), but leaves the backend's numbers as they
+    # are, for tables that are going to be used in more point math
+    out = []
+    for (X, Y, Z), zinv in zip(points, _batch_modinv([p[2] for p in points],P)):
+        if Z == 0:
+            out.append(None)
+            continue
+        zinv2 = (zinv * zinv) % P
+        out.append(((X * zinv2) % P, (Y * zinv2 * zinv) % P))
+    return out
+
+
+def batch_modinv(values,n=P):
+    '''
+    Inverts every element of values with Montgomery's trick: a single
+    modinv() plus three multiplications per element. Zeros have no
+    inverse and are passed through as 0.
+    '''
+
+    return [int(v) for v in _batch_modinv(values,n)]
+
+
+def batch_to_affine(points):
+    '''
+    Converts a list of Jacobian points to affine with one inversion for
+    the whole list. Points at infinity come back as None.
+    '''
+
+    return [None if p is None else (int(p[0]), int(p[1]))
+            for p in _batch_affine(points)]
+
+
+def jacobian_double(X,Y,Z):
+    # a = 0 for secp256k1, which drops a term from the usual formula
+    if Y == 0 or Z == 0:
+        return JACOBIAN_INFINITY
+    YY = (Y * Y) % P
+    S = (4 * X * YY) % P
+    M = (3 * X * X) % P
+    X3 = (M * M - 2 * S) % P
+    Y3 = (M * (S - X3) - 8 * YY * YY) % P
+    Z3 = (2 * Y * Z) % P
+    return X3, Y3, Z3
+
+
+def jacobian_add(X1,Y1,Z1,X2,Y2,Z2):
+    if Z1 == 0:
+        return X2, Y2, Z2
+    if Z2 == 0:
+        return X1, Y1, Z1
+    Z1Z1 = (Z1 * Z1) % P
+    Z2Z2 = (Z2 * Z2) % P
+    U1 = (X1 * Z2Z2) % P
+    U2 = (X2 * Z1Z1) % P
+    S1 = (Y1 * Z2 * Z2Z2) % P
+    S2 = (Y2 * Z1 * Z1Z1) % P
+    H = (U2 - U1) % P
+    R = (S2 - S1) % P
+    if H == 0:
+        if R == 0:
+            return jacobian_double(X1,Y1,Z1)
+        return JACOBIAN_INFINITY
+    HH = (H * H) % P
+    HHH = (H * HH) % P
+    V = (U1 * HH) % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - S1 * HHH) % P
+    Z3 = (Z1 * Z2 * H) % P
+    return X3, Y3, Z3
+
+
+def jacobian_add_affine(X1,Y1,Z1,x2,y2):
+    '''
+    Mixed addition: the second point is affine (Z2 == 1), which saves
+    several multiplications over jacobian_add().
+    '''
+
+    if Z1 == 0:
+        return x2, y2, 1
+    Z1Z1 = (Z1 * Z1) % P
+    U2 = (x2 * Z1Z1) % P
+    S2 = (y2 * Z1 * Z1Z1) % P
+    H = (U2 - X1) % P
+    R = (S2 - Y1) % P
+    if H == 0:
+        if R == 0:
+            return jacobian_double(X1,Y1,Z1)
+        return JACOBIAN_INFINITY
+    HH = (H * H) % P
+    HHH = (H * HH) % P
+    V = (X1 * HH) % P
+    X3 = (R * R - HHH - 2 * V) % P
+    Y3 = (R * (V - X3) - Y1 * HHH) % P
+    Z3 = (Z1 * H) % P
+    return X3, Y3, Z3
+
+
+def jacobian_negate(X,Y,Z):
+    return X, (P - Y) % P, Z
+
+
+def ecadd_many(points,jacobian=False):
+    '''
+    Adds up an iterable of points, given as affine (x, y) or Jacobian
+    (X, Y, Z) tuples. The running total stays in Jacobian form, so the
+    whole sum costs one inversion at the end (or none, with
+    jacobian=True), however many points there are.
+    '''
+
+    X, Y, Z = JACOBIAN_INFINITY
+    for p in points:
+        if len(p) == 2 or p[2] == 1:
+            X, Y, Z = jacobian_add_affine(X,Y,Z,_mpz(p[0]),_mpz(p[1]))
+        else:
+            X, Y, Z = jacobian_add(X,Y,Z,_mpz(p[0]),_mpz(p[1]),_mpz(p[2]))
+    if jacobian:
+        return X, Y, Z
+    return to_affine(X,Y,Z)
+
+
+def ecmultiply_jacobian(xs,ys,scalar):
+    '''
+    Double-and-add with the running total kept in Jacobian form.
+    Returns a Jacobian tuple; use to_affine() or ecmultiply().
+    '''
+
+    if scalar == 0 or scalar >= N:
+        raise Exception("Invalid scalar.")
+    scalarbin = str(bin(scalar)).lstrip('0b')
+    xs, ys = _mpz(xs), _mpz(ys)
+    Q = (xs, ys, 1)
+    for i in range (1, len(scalarbin)):
+        Q = jacobian_double(*Q)
+        if scalarbin[i] == '1':
+            Q = jacobian_add_affine(Q[0],Q[1],Q[2],xs,ys)
+    return Q
+
+
+# Fixed-base multiplication for the generator point
+#
+# The scalar is cut into BASETABLE_WINDOW-bit windows. For window i the
+# table holds d * 2**(BASETABLE_WINDOW*i) * G (for d = 1 .. 2**w - 1),
+# all in affine form, so k*G is just one mixed addition per non-zero
+# window and no doublings at all. The table is built the first time it
+# is needed and then kept for the life of the process.
+
+BASETABLE_WINDOW = 4
+
+_basetable = None
+
+
+def buildbasetable(w=BASETABLE_WINDOW):
+    '''
+    Returns a flat list of affine points for the windowed generator
+    table. Entry d of window i is at index i*(2**w - 1) + (d - 1).
+    '''
+
+    per = (1 << w) - 1
+    table = []
+    Bx, By = _mpz(Gx), _mpz(Gy)
+    for i in range(-(-256 // w)):
+        Q = (Bx, By, 1)
+        window = [Q]
+        for d in range(2, per + 2):
+            Q = jacobian_add_affine(Q[0],Q[1],Q[2],Bx,By)
+            window.append(Q)
+        window = _batch_affine(window)
+        table.extend(window[:-1])
+        Bx, By = window[-1]
+    return table
+
+
+def setbasetable(table,w=BASETABLE_WINDOW):
+    '''
+    Installs a generator table (as returned by buildbasetable()) to be
+    used by ecmultiply_base(). Passing None drops the current table, and
+    a new one is built on next use.
+    '''
+
+    global _basetable, BASETABLE_WINDOW
+    BASETABLE_WINDOW = w
+    _basetable = table
+
+
+def ecmultiply_base(scalar,jacobian=False):
+    '''
+    Multiplies the generator point by scalar using the precomputed
+    table. Same output as ecmultiply_affine(Gx,Gy,scalar).
+    '''
+
+    global _basetable
+    if scalar <= 0 or scalar >= N:
+        raise Exception("Invalid scalar.")
+    table = _basetable
+    w = BASETABLE_WINDOW
+    if table is None:
+        table = _basetable = buildbasetable(w)
+    per = (1 << w) - 1
+    Q = JACOBIAN_INFINITY
+    i = 0
+    while scalar:
+        d = scalar & per
+        if d:
+            x, y = table[i + d - 1]
+            Q = jacobian_add_affine(Q[0],Q[1],Q[2],x,y)
+        scalar >>= w
+        i += per
+    if jacobian:
+        return Q
+    return to_affine(*Q)
+
+
+# Width-w NAF multiplication for arbitrary points
+#
+# The scalar is recoded into signed odd digits in (-2**(w-1), 2**(w-1))
+# with at least w-1 zeros between any two non-zero digits, so there is
+# roughly one addition per w+1 doublings instead of one per two. The
+# odd multiples P, 3P, 5P, ... are precomputed in affine form, and a
+# negative digit just adds the negated point.
+
+WNAF_WINDOW = 5
+
+
+def wnaf(scalar,w=WNAF_WINDOW):
+    '''
+    Returns the width-w NAF digits of scalar, least significant first.
+    '''
+
+    digits = []
+    full = 1 << w
+    half = full >> 1
+    while scalar:
+        if scalar & 1:
+            d = scalar & (full - 1)
+            if d >= half:
+                d -= full
+            scalar -= d
+        else:
+            d = 0
+        digits.append(d)
+        scalar >>= 1
+    return digits
+
+
+def wnaftable(xs,ys,w=WNAF_WINDOW):
+    '''
+    Returns the affine odd multiples [P, 3P, 5P, ... (2**(w-1)-1)P]
+    used by ecmultiply_wnaf(). Entry i is (2*i + 1)*P.
+    '''
+
+    xs, ys = _mpz(xs), _mpz(ys)
+    table = [(xs, ys, 1)]
+    D = jacobian_double(xs,ys,1)
+    Q = (xs, ys, 1)
+    for i in range(1, 1 << (w - 2)):
+        Q = jacobian_add(Q[0],Q[1],Q[2],D[0],D[1],D[2])
+        table.append(Q)
+    return _batch_affine(table)
+
+
+# GLV endomorphism
+#
+# secp256k1 has the cheap endomorphism (x, y) -> (BETA*x, y), which is
+# the same as multiplying the point by LAMBDA. Any scalar k can be split
+# into k1 + k2*LAMBDA (mod N) with k1 and k2 only about 128 bits each,
+# so k*P becomes k1*P + k2*(LAMBDA*P), which only needs half as many
+# doublings. The endomorphism of an affine table is one multiplication
+# per entry, so the second table is nearly free. The wNAF and joint
+# multiplications use it unless glv=False is passed, or GLV_DEFAULT is
+# set to False.
+
+GLV_DEFAULT = True
+
+BETA = 55594575648329892869085402983802832744385952214688224221778511981742606582254
+LAMBDA = 37718080363155996902926221483475020450927657555482586988616620542887997980018
+
+# Short basis for the lattice used by glvsplit()
+_GLV_A1 = 0x3086d221a7d46bcde86c90e49284eb15
+_GLV_B1 = -0xe4437ed6010e88286f547fa90abfe4c3
+_GLV_A2 = 0x114ca50f7a8e2f3f657c1108d9d44cfd8
+_GLV_B2 = _GLV_A1
+
+
+def glvsplit(k):
+    '''
+    Returns (k1, k2) such that k == k1 + k2*LAMBDA (mod N). Either half
+    may be negative, and neither is longer than 128 bits.
+    '''
+
+    c1 = (_GLV_B2 * k + (N >> 1)) // N
+    c2 = (-_GLV_B1 * k + (N >> 1)) // N
+    k1 = k - c1*_GLV_A1 - c2*_GLV_A2
+    k2 = -c1*_GLV_B1 - c2*_GLV_B2
+    return k1, k2
+
+
+def glvtable(table):
+    '''
+    Maps a table of affine points through the endomorphism.
+    '''
+
+    return [((BETA * x) % P, y) for x, y in table]
+
+
+def _wnafterms(k,w,table,glvtab=None):
+    # Returns the (digits, table) pairs that make up k*P, for _interleave()
+    if glvtab is None:
+        return [(wnaf(k,w), table)]
+    terms = []
+    for kk, t in zip(glvsplit(k), (table, glvtab)):
+        if kk > 0:
+            terms.append((wnaf(kk,w), t))
+        elif kk < 0:
+            terms.append(([-d for d in wnaf(-kk,w)], t))
+    return terms
+
+
+def _interleave(terms,jacobian=False):
+    # Sum of all the (digits, table) terms over one chain of doublings
+    Q = JACOBIAN_INFINITY
+    for i in range(max(len(d) for d, t in terms) - 1, -1, -1):
+        Q = jacobian_double(*Q)
+        for digits, table in terms:
+            if i >= len(digits):
+                continue
+            d = digits[i]
+            if d > 0:
+                x, y = table[d >> 1]
+                Q = jacobian_add_affine(Q[0],Q[1],Q[2],x,y)
+            elif d < 0:
+                x, y = table[(-d) >> 1]
+                Q = jacobian_add_affine(Q[0],Q[1],Q[2],x,P-y)
+    if jacobian:
+        return Q
+    return to_affine(*Q)
+
+
+# Per-point table registry
+#
+# Some points get multiplied again and again (a stealth scan key, an
+# account xpub's key, a merchant key checked by verify() all day). For
+# those it pays to keep a wide odd-multiples table around instead of
+# rebuilding a small one on every call. POINT_TABLES is off by default
+# (budget of 0 bytes); give it a budget to turn it on. A point gets a
+# table once it has been multiplied `threshold` times, or right away
+# with register(). Tables are dropped least recently used first when
+# their total estimated size goes over the budget.
+
+class PointTableRegistry(object):
+    def __init__(self, budget=0, threshold=4, w=8):
+        self.budget = int(budget)
+        self.threshold = threshold
+        self.window = w
+        self.used = 0
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+        self._tables = OrderedDict()
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def tablesize(table):
+        '''
+        Rough number of bytes a table takes up in memory.
+        '''
+
+        if isinstance(table, MappedTable):
+            return sys.getsizeof(table)
+        o = sys.getsizeof(table)
+        for x, y in table:
+            o += sys.getsizeof(x) + sys.getsizeof(y) + sys.getsizeof((x, y))
+        return o
+
+    def register(self, xs, ys, table=None):
+        '''
+        Adds a table for the point now, building it if one isn't given.
+        A given table must have been built with this registry's window.
+        '''
+
+        if table is None:
+            table = wnaftable(xs,ys,self.window)
+            self.builds += 1
+        key = (int(xs), int(ys))
+        size = PointTableRegistry.tablesize(table)
+        with self._lock:
+            if key in self._tables:
+                self.used -= self._tables.pop(key)[1]
+            self._tables[key] = (table, size)
+            self.used += size
+            self._evict()
+        return table
+
+    def lookup(self, xs, ys):
+        '''
+        Returns the table for the point, or None if it doesn't have one
+        (yet). Counts the use, and builds the table once the point has
+        been used threshold times.
+        '''
+
+        if not self.budget:
+            return None
+        key = (int(xs), int(ys))
+        with self._lock:
+            entry = self._tables.pop(key, None)
+            if entry is not None:
+                self._tables[key] = entry
+                self.hits += 1
+                return entry[0]
+            n = self._counts.get(key, 0) + 1
+            if n < self.threshold:
+                if len(self._counts) > 65536:
+                    self._counts.clear()
+                self._counts[key] = n
+                return None
+            self._counts.pop(key, None)
+        return self.register(xs,ys)
+
+    def resize(self, budget):
+        with self._lock:
+            self.budget = int(budget)
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._counts.clear()
+            self.used = 0
+
+    def stats(self):
+        with self._lock:
+            return {'tables': len(self._tables), 'bytes': self.used,
+                    'budget': self.budget, 'hits': self.hits,
+                    'builds': self.builds, 'evictions': self.evictions}
+
+    def _evict(self):
+        while self._tables and self.used > self.budget:
+            k, (t, size) = self._tables.popitem(last=False)
+            self.used -= size
+            self.evictions += 1
+
+
+POINT_TABLES = PointTableRegistry()
+
+
+def _pointtable(xs,ys,w):
+    # Returns (table, window) for a point that isn't G
+    if POINT_TABLES.budget:
+        table = POINT_TABLES.lookup(xs,ys)
+        if table is not None:
+            return table, POINT_TABLES.window
+    return wnaftable(xs,ys,w), w
+
+
+def ecmultiply_wnaf(xs,ys,scalar,w=WNAF_WINDOW,jacobian=False,table=None,
+                    glv=None):
+    '''
+    Multiplies an arbitrary point by scalar using a width-w NAF. A table
+    from wnaftable() for the same point and window can be passed in to
+    skip building it. Otherwise POINT_TABLES is checked, if it is
+    turned on. With glv=True, the scalar is split with glvsplit()
+    first. The default is GLV_DEFAULT.
+    '''
+
+    if glv is None:
+        glv = GLV_DEFAULT
+    if scalar <= 0 or scalar >= N:
+        raise Exception("Invalid scalar.")
+    if table is None:
+        table, w = _pointtable(xs,ys,w)
+    glvtab = glvtable(table) if glv else None
+    return _interleave(_wnafterms(scalar,w,table,glvtab),jacobian)
+
+
+# Joint double-scalar multiplication (Strauss/Shamir)
+#
+# a*P + b*Q is computed by walking the wNAF digits of both scalars
+# together, so the two multiplications share one chain of doublings.
+# This is the shape of the ECDSA verification equation. When one of
+# the points is G, a wider odd-multiples table for G is built once and
+# kept, since it will be used over and over.
+
+GWNAF_WINDOW = 7
+
+_gwnaftable = None
+_gwnafglvtable = None
+
+
+def ecmultiply_joint(x1,y1,a,x2,y2,b,w=WNAF_WINDOW,jacobian=False,
+                     glv=None):
+    '''
+    Returns a*(x1,y1) + b*(x2,y2). Either scalar may be zero, but not
+    both. With glv=True, both scalars are split with glvsplit(), and
+    four half-length terms share the doublings. The default is
+    GLV_DEFAULT.
+    '''
+
+    global _gwnaftable, _gwnafglvtable
+    if glv is None:
+        glv = GLV_DEFAULT
+    if a < 0 or a >= N or b < 0 or b >= N or (a == 0 and b == 0):
+        raise Exception("Invalid scalar.")
+    terms = []
+    for x, y, k in ((x1, y1, a), (x2, y2, b)):
+        if k == 0:
+            continue
+        if x == Gx and y == Gy:
+            if _gwnaftable is None:
+                _gwnaftable = wnaftable(Gx,Gy,GWNAF_WINDOW)
+            glvtab = None
+            if glv:
+                if _gwnafglvtable is None:
+                    _gwnafglvtable = glvtable(_gwnaftable)
+                glvtab = _gwnafglvtable
+            terms.extend(_wnafterms(k,GWNAF_WINDOW,_gwnaftable,glvtab))
+        else:
+            table, tw = _pointtable(x,y,w)
+            glvtab = glvtable(table) if glv else None
+            terms.extend(_wnafterms(k,tw,table,glvtab))
+    return _interleave(terms,jacobian)
+
+
+# Multi-scalar multiplication
+#
+# k1*P1 + k2*P2 + ... + kn*Pn. For a handful of terms the Strauss
+# interleaving above is best. For many terms, Pippenger's bucket method
+# wins: the scalars are cut into c-bit windows, and for each window
+# every point is added once into the bucket for its digit. The buckets
+# are then summed with a running total, so each window costs about
+# n + 2**(c+1) additions and c doublings, shared by all the terms.
+
+PIPPENGER_THRESHOLD = 64
+
+
+def _pippenger(terms,jacobian=False,c=None):
+    if c is None:
+        c = max(2, (len(terms).bit_length() * 7) // 10)
+    mask = (1 << c) - 1
+    nbits = max(k.bit_length() for x, y, k in terms)
+    Q = JACOBIAN_INFINITY
+    for shift in range(((nbits + c - 1) // c - 1) * c, -1, -c):
+        for i in range(c):
+            Q = jacobian_double(*Q)
+        buckets = [JACOBIAN_INFINITY] * mask
+        for x, y, k in terms:
+            d = (k >> shift) & mask
+            if d:
+                B = buckets[d - 1]
+                buckets[d - 1] = jacobian_add_affine(B[0],B[1],B[2],x,y)
+        S = T = JACOBIAN_INFINITY
+        for B in reversed(buckets):
+            S = jacobian_add(S[0],S[1],S[2],B[0],B[1],B[2])
+            T = jacobian_add(T[0],T[1],T[2],S[0],S[1],S[2])
+        Q = jacobian_add(Q[0],Q[1],Q[2],T[0],T[1],T[2])
+    if jacobian:
+        return Q
+    return to_affine(*Q)
+
+
+def ecmultiply_sum(terms,jacobian=False):
+    '''
+    Input is an iterable of (x, y, scalar) tuples with affine points.
+    Returns the sum of all scalar*point terms, using Strauss for fewer
+    than PIPPENGER_THRESHOLD terms and Pippenger otherwise.
+    '''
+
+    terms = [(_mpz(x), _mpz(y), k) for x, y, k in terms if k]
+    for x, y, k in terms:
+        if k < 0 or k >= N:
+            raise Exception("Invalid scalar.")
+    if not terms:
+        raise Exception("Invalid scalar.")
+    if len(terms) >= PIPPENGER_THRESHOLD:
+        return _pippenger(terms,jacobian)
+    wnafterms = []
+    for x, y, k in terms:
+        wnafterms.extend(_wnafterms(k,WNAF_WINDOW,wnaftable(x,y)))
+    return _interleave(wnafterms,jacobian)
+
+
+# On-disk tables
+#
+# A table of affine points (the generator table, or a wnaftable() for
+# some other point) can be written to a small binary file and mapped
+# back in with mmap. The file is a 16-byte header followed by 64-byte
+# records of big-endian x and y. The header ends with the first four
+# bytes of hash256() of the records, checked when the file is loaded,
+# and each entry is checked to be on the curve when it is first read
+# out of the mapping. Nothing else is parsed at load time. Every process that
+# loads the same file shares the same pages of the OS page cache, so a
+# pool of workers can each call loadbasetable() in their initializer
+# and start almost immediately.
+
+_TABLE_MAGIC = b'SBFT'
+_TABLE_VERSION = 2
+_TABLE_HEADER = struct.Struct('>4sBBHI4s')
+
+try:
+    _bytestoint = lambda b: int.from_bytes(b,'big')
+    _bytestoint(b'\x01')
+except AttributeError:
+    _bytestoint = lambda b: int(hexlify(b),16)
+
+
+class MappedTable(object):
+    '''
+    Read-only, list-like view of a table file made by savetable().
+    Each entry is decoded from the mapping the first time it is used
+    and kept in a list after that, so the file is only the shared
+    starting point and lookups run at in-memory table speed.
+    '''
+
+    __slots__ = ('window', '_file', '_map', '_len', '_entries')
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except:
+            self._file.close()
+            raise
+        magic, version, self.window, z, self._len, check = \
+            _TABLE_HEADER.unpack(self._map[:_TABLE_HEADER.size])
+        if magic != _TABLE_MAGIC or version != _TABLE_VERSION or \
+           len(self._map) != _TABLE_HEADER.size + 64 * self._len:
+            self.close()
+            raise Exception("Not a valid table file.")
+        if _tablecheck(self._map[_TABLE_HEADER.size:]) != check:
+            self.close()
+            raise Exception("Table file is corrupt.")
+        self._entries = [None] * self._len
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self._len
+        if i < 0 or i >= self._len:
+            raise IndexError("Table index out of range.")
+        e = self._entries[i]
+        if e is None:
+            o = _TABLE_HEADER.size + 64 * i
+            x = _mpz(_bytestoint(self._map[o:o+32]))
+            y = _mpz(_bytestoint(self._map[o+32:o+64]))
+            if x >= P or y >= P or (y*y - x*x*x - 7) % P:
+                raise Exception("Table file is corrupt.")
+            e = self._entries[i] = (x, y)
+        return e
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self[i]
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _tablecheck(body):
+    return hashlib.sha256(hashlib.sha256(body).digest()).digest()[:4]
+
+
+def savetable(path,table,w=0):
+    '''
+    Writes a list of affine points to path, along with the window size
+    it was built for (0 if it doesn't have one).
+    '''
+
+    body = b''.join(unhexlify('%064x%064x' % (x, y)) for x, y in table)
+    with open(path, 'wb') as f:
+        f.write(_TABLE_HEADER.pack(_TABLE_MAGIC, _TABLE_VERSION, w, 0,
+                                   len(table), _tablecheck(body)))
+        f.write(body)
+
+
+def loadtable(path):
+    return MappedTable(path)
+
+
+def savebasetable(path):
+    '''
+    Writes the generator table for the current BASETABLE_WINDOW.
+    '''
+
+    global _basetable
+    if _basetable is None:
+        _basetable = buildbasetable(BASETABLE_WINDOW)
+    savetable(path,_basetable,BASETABLE_WINDOW)
+
+
+def loadbasetable(path):
+    '''
+    Maps a file written by savebasetable() and installs it as the
+    generator table.
+    '''
+
+    table = MappedTable(path)
+    if not table.window or \
+       len(table) != (-(-256 // table.window)) * ((1 << table.window) - 1) or \
+       table[0] != (Gx, Gy):
+        table.close()
+        raise Exception("Not a generator table.")
+    setbasetable(table,table.window)
+    return table
+
+
+# Walking sequential keys
+#
+# For a range of consecutive private keys k, k+1, k+2, ... each public
+# key is just the previous one plus G, so only the first one needs a
+# scalar multiplication. The points are produced in Jacobian form a
+# block at a time and normalized with one inversion per block.
+
+try:
+    _inttobytes32 = lambda n: int(n).to_bytes(32,'big')
+    _inttobytes32(1)
+except AttributeError:
+    _inttobytes32 = lambda n: unhexlify('%064x' % n)
+
+
+def ecwalk(scalar,count=None,blocksize=1024,encoding=None):
+    '''
+    Yields the points scalar*G, (scalar+1)*G, ... for count points, or
+    until the scalar would reach N if count is None.
+
+    encoding can be None for (x, y) int tuples, or 'compressed' or
+    'uncompressed' for the 33- or 65-byte public key encodings, which
+    are ready to be hashed.
+    '''
+
+    if encoding not in (None, 'compressed', 'uncompressed'):
+        raise Exception("Unknown encoding: %s" % str(encoding))
+    if count is None or scalar + count > N:
+        count = N - scalar
+    if count <= 0:
+        return
+    Q = ecmultiply_base(scalar,True)
+    gx, gy = _mpz(Gx), _mpz(Gy)
+    while count > 0:
+        n = min(blocksize, count)
+        block = [Q]
+        for i in range(n - 1):
+            Q = jacobian_add_affine(Q[0],Q[1],Q[2],gx,gy)
+            block.append(Q)
+        if n == count:
+            Q = None
+        else:
+            Q = jacobian_add_affine(Q[0],Q[1],Q[2],gx,gy)
+        count -= n
+        for x, y in _batch_affine(block):
+            if encoding is None:
+                yield int(x), int(y)
+            elif encoding == 'compressed':
+                yield (b'\x03' if y & 1 else b'\x02') + _inttobytes32(x)
+            else:
+                yield b'\x04' + _inttobytes32(x) + _inttobytes32(y)
+
+
+def ecmultiply(xs,ys,scalar):
+    if xs == Gx and ys == Gy:
+        return ecmultiply_base(scalar)
+    return ecmultiply_wnaf(xs,ys,scalar)
+
+
 def pow_mod(x,y,z):
-    n = 1
-    while y:
-        if y & 1:
-            n = n * x % z
-        y >>= 1
-        x = x * x % z
-    return n
+    return int(_powmod(x,y,z))
+
+
+def decompress_y(x,odd):
+    '''
+    Returns the y coordinate for x on the curve, choosing the root whose
+    parity matches odd. P % 4 == 3, so the square root is a single
+    exponentiation.
+    '''
+
+    x = _mpz(x)
+    y = _powmod((x*x*x + 7) % P, (P+1)//4, P)
+    if y % 2 != odd:
+        y = P - y
+    return int(y)
+
+
+class Point(object):
+    '''
+    A curve point that keeps its integer coordinates, so chains of point
+    math don't keep converting to and from hex. Results of +, - and *
+    stay in Jacobian form until the affine coordinates or an encoding
+    are asked for. The encodings are computed once and cached.
+    '''
+
+    __slots__ = ('X', 'Y', 'Z', '_cache')
+
+    def __init__(self, X, Y, Z=1):
+        self.X, self.Y, self.Z = X, Y, Z
+        self._cache = None
+
+    @classmethod
+    def fromscalar(cls, k):
+        '''
+        Returns k*G, from the precomputed generator table.
+        '''
+
+        return cls(*ecmultiply_base(k,True))
+
+    @classmethod
+    def fromhex(cls, pub):
+        '''
+        Input is a 66-char compressed or 130-char uncompressed hex
+        public key. It is not checked to be on the curve.
+        '''
+
+        if len(pub) == 66 and pub[:2] in ('02', '03'):
+            x = int(pub[2:],16)
+            return cls(x, decompress_y(x, int(pub[:2],16) - 2))
+        elif len(pub) == 130 and pub[:2] == '04':
+            return cls(int(pub[2:66],16), int(pub[66:],16))
+        raise Exception("Invalid public key.")
+
+    @classmethod
+    def frombytes(cls, pub):
+        return cls.fromhex(hexlify(pub).decode('ascii'))
+
+    def isinfinity(self):
+        return self.Z == 0
+
+    def affine(self):
+        '''
+        Returns (x, y) as ints, normalizing the stored coordinates.
+        '''
+
+        if self.Z != 1:
+            self.X, self.Y = to_affine(self.X, self.Y, self.Z)
+            self.Z = 1
+        return int(self.X), int(self.Y)
+
+    @property
+    def x(self):
+        return self.affine()[0]
+
+    @property
+    def y(self):
+        return self.affine()[1]
+
+    def tohex(self, compressed=True):
+        if self._cache is None:
+            self._cache = {}
+        o = self._cache.get(compressed)
+        if o is None:
+            x, y = self.affine()
+            if compressed:
+                o = ('03' if y & 1 else '02') + '%064x' % x
+            else:
+                o = '04%064x%064x' % (x, y)
+            o = str(o)
+            self._cache[compressed] = o
+        return o
+
+    def tobytes(self, compressed=True):
+        if self._cache is None:
+            self._cache = {}
+        key = 'b' + str(bool(compressed))
+        o = self._cache.get(key)
+        if o is None:
+            o = self._cache[key] = unhexlify(self.tohex(compressed))
+        return o
+
+    def __add__(self, other):
+        if other.Z == 1:
+            Q = jacobian_add_affine(self.X, self.Y, self.Z, other.X, other.Y)
+        elif self.Z == 1:
+            Q = jacobian_add_affine(other.X, other.Y, other.Z, self.X, self.Y)
+        else:
+            Q = jacobian_add(self.X, self.Y, self.Z, other.X, other.Y, other.Z)
+        return type(self)(*Q)
+
+    def __neg__(self):
+        return type(self)(self.X, (P - self.Y) % P, self.Z)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, k):
+        x, y = self.affine()
+        if x == Gx and y == Gy:
+            return type(self)(*ecmultiply_base(k,True))
+        return type(self)(*ecmultiply_wnaf(x,y,k,jacobian=True))
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other):
+        if not isinstance(other, Point):
+            return NotImplemented
+        if self.Z == 0 or other.Z == 0:
+            return self.Z == other.Z
+        # Compare without inverting: X1*Z2**2 == X2*Z1**2, same for Y
+        z1z1 = (self.Z * self.Z) % P
+        z2z2 = (other.Z * other.Z) % P
+        return (self.X * z2z2 - other.X * z1z1) % P == 0 and \
+               (self.Y * z2z2 * other.Z - other.Y * z1z1 * self.Z) % P == 0
+
+    def __ne__(self, other):
+        o = self.__eq__(other)
+        if o is NotImplemented:
+            return o
+        return not o
+
+    def __hash__(self):
+        return hash(self.affine())
 
+    def __repr__(self):
+        if self.Z == 0:
+            return '%s(infinity)' % type(self).__name__
+        return '%s(%s)' % (type(self).__name__, self.tohex(False))
@@ -33,6 +33,10 @@ except Exception as e:
     from bip39wordlists import BIP39ENGWORDLIST
 
 
+# HMAC-SHA512 keyed with the seed version constant
+SEED_VERSION_MIDSTATE = hmacmidstate(bytearray("Seed version",'utf-8'))
+
+
 class Electrum2(object):
     def __init__(self,a=128,prefix="01",customentropy=1):
         if isitint(a):
@@ -111,8 +115,7 @@ class Electrum2(object):
             assert Electrum2.validateentropy(words,prefix,customentropy)
         except:
             return False
-        o = hexstrlify(hmac.new(bytearray("Seed version",'utf-8'),
-                       bytearray(words,'utf-8'), hashlib.sha512).digest())
+        o = hexstrlify(SEED_VERSION_MIDSTATE.digest(bytearray(words,'utf-8')))
         return o.startswith(prefix)
 
     @staticmethod
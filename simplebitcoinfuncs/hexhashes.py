@@ -10,62 +10,256 @@ on. In time-sensitive and efficient applications, these functions
 should probably not be used, but for learning purposes, I was happy
 to have them.
 
-The point of doing this:
-# >>> str().rstrip("'").replace("b'","",1).replace("'","")
-is to convert Python 3 byte objects to strings.
-rstrip must go first so that strings like "b'adcb'" don't get the
-right b lopped off. See miscfuncs.strlify() for more info.
+The *_b functions are the same hashes on raw data. They take bytes,
+bytearray or memoryview and return bytes, and are what the rest of
+the library uses internally. The hex functions are just wrappers
+around them.
 '''
 
 
 from binascii import hexlify, unhexlify
 import hashlib
+import hmac
+import mmap
+import os
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # Python 2 without the futures backport installed
+    ProcessPoolExecutor = None
+
+
+# *_b functions: input bytes-like object, output bytes
+
+
+def sha256_b(data):
+    return hashlib.sha256(data).digest()
+
+
+def sha512_b(data):
+    return hashlib.sha512(data).digest()
+
+
+def sha512d_b(data):
+    return hashlib.sha512(hashlib.sha512(data).digest()).digest()
+
+
+def ripemd160_b(data):
+    h = hashlib.new('ripemd160')
+    h.update(data)
+    return h.digest()
+
+
+def hash160_b(data):
+    h = hashlib.new('ripemd160')
+    h.update(hashlib.sha256(data).digest())
+    return h.digest()
+
+
+def hash256_b(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+def hash512_b(data):
+    return hashlib.sha512(hashlib.sha256(data).digest()).digest()
+
+
+class Midstate(object):
+    '''
+    A hash (or HMAC) that has already absorbed a constant prefix (or
+    key). digest(data) hashes prefix + data by copying the saved state,
+    so the prefix is only ever processed once. Use midstate() and
+    hmacmidstate() to make one.
+    '''
+
+    __slots__ = ('_h',)
+
+    def __init__(self, h):
+        self._h = h
+
+    def digest(self, data=b''):
+        h = self._h.copy()
+        h.update(data)
+        return h.digest()
+
+    def hexdigest(self, hexstring=''):
+        return _hexout(self.digest(unhexlify(hexstring)))
+
+
+def midstate(prefix, name='sha256'):
+    return Midstate(hashlib.new(name, prefix))
+
+
+def hmacmidstate(key, digestmod=hashlib.sha512):
+    return Midstate(hmac.new(key, digestmod=digestmod))
+
+
+def _hexout(b):
+    # Python 3 bytes -> str, and keeps Python 2 from handing back unicode
+    return str(hexlify(b).decode('ascii'))
 
 
 # All functions: input ascii hex string, output ascii hex string
 
 
 def sha256(hexstring):
-    return str(hexlify(hashlib.sha256(unhexlify(hexstring)).digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(sha256_b(unhexlify(hexstring)))
 
 
 def sha512(hexstring):
-    return str(hexlify(hashlib.sha512(unhexlify(hexstring)).digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(sha512_b(unhexlify(hexstring)))
 
 
 def sha512d(hexstring):
-    return str(hexlify(
-           hashlib.sha512(hashlib.sha512(unhexlify(hexstring))
-                  .digest())     .digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(sha512d_b(unhexlify(hexstring)))
 
 
 def ripemd160(hexstring):
-    h = hashlib.new('ripemd160')
-    h.update(unhexlify(hexstring))
-    return str(hexlify(h.digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(ripemd160_b(unhexlify(hexstring)))
 
 
 def hash160(hexstring):
-    h = hashlib.new('ripemd160')
-    h.update(hashlib.sha256(unhexlify(hexstring)).digest())
-    return str(hexlify(h.digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(hash160_b(unhexlify(hexstring)))
 
 
 def hash256(hexstring):
-    return str(hexlify(
-           hashlib.sha256(hashlib.sha256(unhexlify(hexstring))
-                  .digest())     .digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(hash256_b(unhexlify(hexstring)))
 
 
 def hash512(hexstring):
-    return str(hexlify(
-           hashlib.sha512(hashlib.sha256(unhexlify(hexstring))
-                  .digest())     .digest())) \
-           .rstrip("'").replace("b'","",1).replace("'","")
+    return _hexout(hash512_b(unhexlify(hexstring)))
+
+
+# Batched hashing
+#
+# The *_many functions hash a lot of records at once and return all the
+# digests packed end to end in one bytes object (so the i-th hash160 is
+# out[20*i:20*i+20]). Input is either an iterable of bytes-like records,
+# or one contiguous buffer plus the width of each record in it, which
+# is sliced with memoryview and never copied. Above MANY_THRESHOLD
+# records the work is split into MANY_CHUNK-record pieces and handed
+# to a process pool, if concurrent.futures is available.
+
+MANY_THRESHOLD = 200000
+MANY_CHUNK = 20000
+
+
+def _hashrecords(func, records, width=None):
+    if width:
+        mv = memoryview(records)
+        return b''.join([func(mv[i:i+width])
+                         for i in range(0, len(mv), width)])
+    return b''.join([func(r) for r in records])
+
+
+def _many(func, data, width=None, processes=None, threshold=None):
+    if threshold is None:
+        threshold = MANY_THRESHOLD
+    if width:
+        data = memoryview(data)
+        if data.itemsize != 1:
+            data = data.cast('B')
+        if len(data) % width:
+            raise Exception("Buffer length is not a multiple of the record width.")
+        count = len(data) // width
+    else:
+        if not isinstance(data, (list, tuple)):
+            data = list(data)
+        count = len(data)
+    if ProcessPoolExecutor is None or processes == 1 or count <= threshold:
+        return _hashrecords(func, data, width)
+    if width:
+        step = MANY_CHUNK * width
+        chunks = [data[i:i+step].tobytes() for i in range(0, len(data), step)]
+    else:
+        # Workers get plain bytes; memoryview records can't be pickled
+        chunks = [[bytes(bytearray(r)) for r in data[i:i+MANY_CHUNK]]
+                  for i in range(0, count, MANY_CHUNK)]
+    n = len(chunks)
+    with ProcessPoolExecutor(processes) as ex:
+        return b''.join(ex.map(_hashrecords, [func]*n, chunks, [width]*n))
+
+
+def sha256_many(data, width=None, processes=None, threshold=None):
+    '''
+    sha256_b() of every record, packed into one bytes object.
+    Use width to pass a contiguous buffer of fixed-width records.
+    '''
+
+    return _many(sha256_b, data, width, processes, threshold)
+
+
+def hash160_many(data, width=None, processes=None, threshold=None):
+    '''
+    hash160_b() of every record, packed into one bytes object.
+    Use width to pass a contiguous buffer of fixed-width records.
+    '''
+
+    return _many(hash160_b, data, width, processes, threshold)
+
+
+def hash256_many(data, width=None, processes=None, threshold=None):
+    '''
+    hash256_b() of every record, packed into one bytes object.
+    Use width to pass a contiguous buffer of fixed-width records.
+    '''
+
+    return _many(hash256_b, data, width, processes, threshold)
+
+
+# Hashing files
+#
+# The *_file functions take a path or an open binary file object. A
+# path is mapped with mmap and hashed straight out of the page cache;
+# a file object (or a path mmap can't handle, like a pipe) is read in
+# HASH_CHUNK-sized pieces from its current position. Either way memory
+# use stays constant however big the file is. For data that is already
+# in memory, the *_b functions above take any buffer without copying.
+
+HASH_CHUNK = 1 << 20
+
+
+def _hashfile(name, f):
+    h = hashlib.new(name)
+    if not hasattr(f, 'read'):
+        if hasattr(os, 'fspath'):
+            # pathlib.Path and other os.PathLike objects
+            f = os.fspath(f)
+        with open(f, 'rb') as fo:
+            try:
+                m = mmap.mmap(fo.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, EnvironmentError):
+                # Empty file, or something that can't be mapped
+                _hashchunks(h, fo)
+            else:
+                try:
+                    h.update(m)
+                finally:
+                    m.close()
+    else:
+        _hashchunks(h, f)
+    return h
+
+
+def _hashchunks(h, f):
+    while True:
+        chunk = f.read(HASH_CHUNK)
+        if not chunk:
+            break
+        h.update(chunk)
+
+
+def sha256_file_b(f):
+    return _hashfile('sha256', f).digest()
+
+
+def hash256_file_b(f):
+    return sha256_b(_hashfile('sha256', f).digest())
+
+
+def sha256_file(f):
+    return _hexout(sha256_file_b(f))
+
 
+def hash256_file(f):
+    return _hexout(hash256_file_b(f))
@@ -0,0 +1,146 @@
+﻿#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+'''
+Bitcoin merkle trees: roots, branches (the list of sibling hashes that
+proves a leaf is in the tree) and branch verification.
+
+The *_b functions work on 32-byte hashes in internal byte order, the
+way they come out of hash256_b() and the way they sit in blocks. Txids
+as shown by block explorers and RPC are the same bytes reversed; the
+hex functions take and return that order.
+
+As in Bitcoin, a level with an odd number of nodes is completed by
+pairing its last node with itself.
+'''
+
+
+from binascii import unhexlify
+try:
+    ModuleNotFoundError
+except:
+    ModuleNotFoundError = ImportError
+
+try:
+    from .hexhashes import hash256_b, hash256_many
+    from .miscfuncs import hexstrlify
+except Exception as e:
+    if type(e) != ImportError and \
+       type(e) != ModuleNotFoundError and \
+       type(e) != ValueError and \
+       type(e) != SystemError:
+        raise Exception("Unknown problem with imports.")
+    from hexhashes import hash256_b, hash256_many
+    from miscfuncs import hexstrlify
+
+
+def _merklestream(leaves, pos=-1):
+    # Walks the leaves once, keeping only the one pending left node per
+    # level (so O(log n) hashes, not whole levels). If pos is a leaf
+    # index, the branch for that leaf is collected along the way.
+    # Same algorithm as MerkleComputation() in Bitcoin Core.
+    inner = [None] * 64
+    branch = []
+    count = 0
+    matchlevel = -1
+    for h in leaves:
+        assert len(h) == 32
+        matchh = count == pos
+        count += 1
+        level = 0
+        while not count & (1 << level):
+            if matchh:
+                branch.append(inner[level])
+            elif matchlevel == level:
+                branch.append(h)
+                matchh = True
+            h = hash256_b(inner[level] + h)
+            level += 1
+        inner[level] = h
+        if matchh:
+            matchlevel = level
+    if not count:
+        raise Exception("No leaves.")
+    if pos >= count:
+        raise Exception("Leaf index out of range.")
+
+    # Finish the unpaired nodes on the right-hand edge of the tree
+    level = 0
+    while not count & (1 << level):
+        level += 1
+    h = inner[level]
+    matchh = matchlevel == level
+    while count != (1 << level):
+        if matchh:
+            branch.append(h)
+        h = hash256_b(h + h)
+        count += 1 << level
+        level += 1
+        while not count & (1 << level):
+            if matchh:
+                branch.append(inner[level])
+            elif matchlevel == level:
+                branch.append(h)
+                matchh = True
+            h = hash256_b(inner[level] + h)
+            level += 1
+    return h, branch
+
+
+def merkleroot_b(leaves):
+    '''
+    Input is a list of 32-byte leaf hashes, or any iterator of them.
+    A list is hashed a whole level at a time with hash256_many(); an
+    iterator is streamed and never held in memory.
+    '''
+
+    if not isinstance(leaves, (list, tuple)):
+        return _merklestream(leaves)[0]
+    if not leaves:
+        raise Exception("No leaves.")
+    for leaf in leaves:
+        assert len(leaf) == 32
+    level = b''.join(leaves)
+    while len(level) > 32:
+        if len(level) % 64:
+            level += level[-32:]
+        # In-process: a level of 64-byte records is too cheap to hash
+        # to be worth shipping to a new process pool every level
+        level = hash256_many(level, 64, processes=1)
+    return bytes(level)
+
+
+def merklebranch_b(leaves, index):
+    '''
+    Returns (root, branch) for the leaf at index, where branch is the
+    list of sibling hashes from the bottom of the tree up. Leaves can
+    be a list or an iterator, as with merkleroot_b().
+    '''
+
+    return _merklestream(leaves, index)
+
+
+def merkleverify_b(leaf, branch, index, root):
+    '''
+    Checks that leaf, at position index, hashes up to root through
+    branch.
+    '''
+
+    h = leaf
+    for sibling in branch:
+        if index & 1:
+            h = hash256_b(sibling + h)
+        else:
+            h = hash256_b(h + sibling)
+        index >>= 1
+    return index == 0 and h == root
+
+
+def merkleroot(txids):
+    '''
+    Input is an iterable of txid hex strings, output is the merkle root
+    hex string, both in the usual displayed (reversed) byte order.
+    '''
+
+    return hexstrlify(merkleroot_b(unhexlify(t)[::-1] for t in txids)[::-1])
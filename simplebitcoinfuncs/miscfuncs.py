@@ -9,7 +9,9 @@ to Python 2/3 compatibility issues and other common annoyances.
 
 
 import sys
+import threading
 import unicodedata
+from collections import OrderedDict
 from binascii import hexlify, unhexlify
 try:
     from codecs import decode
@@ -165,3 +167,76 @@ def normalize_input(input,preferunicodeoverstring=False,nfconly=False):
         except:
             return unicodedata.normalize('NFKD',input)
 
+
+class LRUCache(object):
+    '''
+    Small bounded least-recently-used cache, safe to share between
+    threads, with hit and miss counters. Used for the various optional
+    caches around the package (decompressed pubkeys, etc.).
+
+    A maxsize of 0 turns the cache off: get() returns the default
+    without counting anything and put() does nothing.
+    '''
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = int(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        if not self.maxsize:
+            return default
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize):
+        '''
+        Sets a new maximum size, dropping the oldest entries if needed.
+        Use 0 to turn the cache off.
+        '''
+
+        with self._lock:
+            self.maxsize = int(maxsize)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        '''
+        Empties the cache and resets the counters.
+        '''
+
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {'size': len(self._data), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses,
+                    'hitratio': (self.hits / float(total)) if total else 0.0}
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
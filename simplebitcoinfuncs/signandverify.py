@@ -106,16 +106,20 @@ def verify(hash,sig,pub,exceptonhighS=False):
     s = int(sig[(12+rlen):],16) # Ignoring s-len; format dictates it
                                 #   will be to the end of string
     assert r < N
+    if r == 0 or s % N == 0:
+        return False
 
     if exceptonhighS:
         if s > (N / 2):
             raise TypeError("High S value.")
 
+    x, y = PublicKey.fromhex(pub).affine()
     w = modinv(s,N)
-    x = int(addpubs(
-              privtopub(dechex((int(hash,16) * w) % N,32),False),
-              multiplypub(pub,dechex((r*w) % N,32),False),
-            False)[2:66],16)
+    X, Y, Z = ecmultiply_joint(Gx,Gy,(int(hash,16) * w) % N,
+                               x,y,(r*w) % N,jacobian=True)
+    if Z == 0:
+        return False
+    x, y = to_affine(X,Y,Z)
     return x==r
 
 
@@ -182,6 +186,10 @@ def checksigformat(a,invalidatehighS=False):
     return True
 
 
+# sha256 with the signed message magic already absorbed
+MSG_MIDSTATE = midstate(bytearray("\x18Bitcoin Signed Message:\n",'utf-8'))
+
+
 def signmsg(msg,priv,iscompressed,k=0):
     '''
     Sign a message -- the message itself, not a hash -- with a given
@@ -237,10 +245,9 @@ def signmsg(msg,priv,iscompressed,k=0):
     # implementation I found, including Bitcoin Core
     msg = msg.replace("\r\n","\n")
 
-    msg1 = hexstrlify(bytearray("\x18Bitcoin Signed Message:\n",'utf-8'))
-    msg2 = tovarint(len(msg))
-    msg3 = hexstrlify(bytearray(msg,'utf-8'))
-    msg = hash256(msg1 + msg2 + msg3)
+    msg2 = unhexlify(tovarint(len(msg)))
+    msg3 = bytearray(msg,'utf-8')
+    msg = hexstrlify(sha256_b(MSG_MIDSTATE.digest(msg2 + msg3)))
 
 
     sig = sign(msg,priv,k)
@@ -291,15 +298,16 @@ def verifymsg(msg,sig):
     msg = msg.replace("\r\n","\n")
     # Again, standard convention to remove returns
 
-    msg1 = hexstrlify(bytearray("\x18Bitcoin Signed Message:\n",'utf-8'))
-    msg2 = tovarint(len(msg))
-    msg3 = hexstrlify(bytearray(msg,'utf-8'))
-    msg = hash256(msg1 + msg2 + msg3)
+    msg2 = unhexlify(tovarint(len(msg)))
+    msg3 = bytearray(msg,'utf-8')
+    msg = hexstrlify(sha256_b(MSG_MIDSTATE.digest(msg2 + msg3)))
 
     sig = hexstrlify(base64.b64decode(sig))
 
     r = int(sig[2:66],16)
     s = int(sig[66:],16)
+    if r % N == 0:
+        return False
 
     prefix = int(sig[:2],16)
     if prefix > 30:
@@ -311,27 +319,13 @@ def verifymsg(msg,sig):
 
     m = int(N*prefix) if prefix > 1 else 0
     x = (r + int(m//2)) % N
-    a = (pow_mod(x, 3, P) + 7) % P
-    b = pow_mod(a, ((P+1)//4), P)
-    if (b % 2) != prefix:
-        y = (-b % P)
-    else:
-        y = b
-
-    x, y = dechex(x,32), dechex(y,32)
-    pubkey = "04" + x + y
-
-    negative_msg = dechex((N - int(msg,16)),32)
-    modinv_r = dechex(modinv(r, N),32)
-    pubkey = multiplypub(
-                   addpubs(
-                     multiplypub(pubkey,dechex(s,32),False),
-                     privtopub(negative_msg,False),False),
-                   modinv_r,False)
-
-    if out_compressed:
-        pubkey = compress(pubkey)
-    return strlify(pubkey)
+    y = decompress_y(x, prefix % 2)
+
+    # Q = r^-1 * (s*R - e*G), done as one joint multiplication
+    modinv_r = modinv(r, N)
+    pubkey = PublicKey(*ecmultiply_joint(Gx,Gy,((N - int(msg,16)) * modinv_r) % N,
+                                         x,y,(s * modinv_r) % N,jacobian=True))
+    return pubkey.tohex(out_compressed)
 
 
 def checkmsgsigformat(sig,invalidatehighS=False):
@@ -33,6 +33,10 @@ except Exception as e:
     from bitcoin import *
 
 
+# sha256 of the stealth OP_RETURN, starting with OP_RETURN PUSH(38) 0x06
+OPRETURN_MIDSTATE = midstate(unhexlify('6a2606'))
+
+
 def paystealth(stealthaddr,ephempriv=None,_doctest_nonce=-1):
     '''
     Input a stealth address, and optionally an ephemeral private key,
@@ -66,6 +70,7 @@ def paystealth(stealthaddr,ephempriv=None,_doctest_nonce=-1):
     scanpub = addrhex[4:70]
     spendpub = addrhex[72:-4]
     ephempub = privtopub(ephempriv,True)
+    ephempubbytes = unhexlify(ephempub)
     secret = sha256(multiplypub(scanpub,ephempriv,True))
     paykey = addpubs(spendpub,privtopub(secret,False),True)
 
@@ -79,7 +84,8 @@ def paystealth(stealthaddr,ephempriv=None,_doctest_nonce=-1):
         if nonce > 4294967295:
             nonce = 0
         noncehex = dechex(nonce,4)
-        hashprefix = unhexlify(hash256('6a2606' + noncehex + ephempub))[::-1][:4]
+        hashprefix = sha256_b(OPRETURN_MIDSTATE.digest(unhexlify(noncehex) + \
+                                                      ephempubbytes))[::-1][:4]
         prebits = int(addrhex[-4:-2],16)
         if prebits == 0:
            break